@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,6 +40,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "core",
     "rest_framework",
     "rest_framework.authtoken",
@@ -48,6 +51,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -82,13 +86,74 @@ WSGI_APPLICATION = "app.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.postgresql_pool",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        # Connections stay open in a pool per process, see the backend.
+        "POOL": {
+            "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            "MAX_LIFETIME": float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600)),
+            "CHECK_AFTER": float(os.environ.get("DB_POOL_CHECK_AFTER", 30)),
+        },
+    }
+}
+
+# Read replicas, as comma separated `host[:port]`, sharing the name and
+# credentials of the primary unless DB_REPLICA_NAME/USER/PASS are set. For
+# local testing, a replica can be a second database or the primary itself.
+for number, address in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), start=1
+):
+    host, _, port = address.strip().partition(":")
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port,
+        "NAME": os.environ.get("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),
+        "USER": os.environ.get("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": os.environ.get(
+            "DB_REPLICA_PASS", DATABASES["default"]["PASSWORD"]
+        ),
+        "TEST": {"MIRROR": "default"},
     }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.db.routers.ReplicaRouter"]
+# Seconds reads of a user stay on the primary after a write, which should
+# exceed the replication lag.
+DB_REPLICA_PIN_SECONDS = float(os.environ.get("DB_REPLICA_PIN_SECONDS", 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHE_BACKEND = os.environ.get(
+    "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+CACHE_LOCATION = os.environ.get("CACHE_LOCATION", "")
+
+CACHES = {
+    "default": {"BACKEND": CACHE_BACKEND, "LOCATION": CACHE_LOCATION},
+    "auth": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": CACHE_LOCATION or "auth",
+        "KEY_PREFIX": "auth",
+        "TIMEOUT": int(os.environ.get("AUTH_CACHE_TIMEOUT", 60)),
+    },
 }
+if CACHE_BACKEND.endswith("LocMemCache"):
+    CACHES["auth"]["OPTIONS"] = {
+        "MAX_ENTRIES": int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", 10000))
+    }
+# Reads are pinned to the primary through the default cache, which only
+# holds across workers when it is shared.
+if DATABASE_REPLICAS and CACHE_BACKEND.endswith("LocMemCache"):
+    raise ImproperlyConfigured(
+        "DB_REPLICA_HOSTS needs a shared CACHE_BACKEND, as reads pinned to "
+        "the primary after a write are recorded in the cache."
+    )
 
 
 # Password validation
@@ -125,6 +190,45 @@ STATIC_URL = "/static/static/"
 MEDIA_URL = "/static/media/"
 STATIC_ROOT = "/vol/web/static"
 MEDIA_ROOT = "/vol/web/media"
+# Fingerprint static files and write precompressed copies on collectstatic.
+if bool(int(os.environ.get("STATIC_PRECOMPRESS", 0))):
+    STATICFILES_STORAGE = "core.storage.CompressedManifestStaticFilesStorage"
+
+# Hand authenticated media downloads off to nginx under an internal prefix.
+MEDIA_ACCEL_REDIRECT = bool(int(os.environ.get("MEDIA_ACCEL_REDIRECT", 0)))
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+# Store recipe images once per content, named by their SHA-256.
+RECIPE_IMAGE_CONTENT_ADDRESSED = bool(
+    int(os.environ.get("RECIPE_IMAGE_CONTENT_ADDRESSED", 0))
+)
+# Number of background threads generating resized recipe image variants.
+IMAGE_VARIANT_WORKERS = int(os.environ.get("IMAGE_VARIANT_WORKERS", 2))
+# Size budget of the on-demand image resize cache under MEDIA_ROOT.
+IMAGE_RESIZE_CACHE_BYTES = int(os.environ.get("IMAGE_RESIZE_CACHE_BYTES", 1024 ** 3))
+
+# Response compression. Only the listed content types are compressed; HTML
+# is left out as its pages carry CSRF tokens (BREACH).
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_CONTENT_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/vnd.oai.openapi",
+    "application/vnd.oai.openapi+json",
+    "application/javascript",
+    "text/css",
+    "text/javascript",
+    "text/csv",
+    "image/svg+xml",
+}
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Worker threads running the blocking part of the async views under ASGI.
+# Each holds a pooled database connection, so workers beyond DB_POOL_MAX_SIZE
+# would only wait on the pool, failing after DB_POOL_TIMEOUT.
+ASYNC_THREAD_WORKERS = int(
+    os.environ.get("ASYNC_THREAD_WORKERS", DATABASES["default"]["POOL"]["MAX_SIZE"])
+)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -133,7 +237,18 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "core.User"
 
-REST_FRAMEWORK = {"DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema"}
+REST_FRAMEWORK = {
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
 
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
@@ -16,14 +16,18 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from django.conf.urls.static import static
-from django.conf import settings
 
 from core import views as core_views
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('api/health-check/', core_views.health_check, name='health-check'),
+    path(
+        "api/async/health-check/",
+        core_views.health_check_async,
+        name="async-health-check",
+    ),
+    path("api/db-pool-stats/", core_views.db_pool_stats, name="db-pool-stats"),
     path("api/schema", SpectacularAPIView.as_view(), name="api-schema"),
     path(
         "api/docs",
@@ -33,6 +37,3 @@ urlpatterns = [
     path("api/user/", include("user.urls")),
     path("api/recipe/", include("recipe.urls")),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -2,10 +2,13 @@
 Config Tests Pytest
 """
 
+from contextlib import contextmanager
 from decimal import Decimal
 from pathlib import Path
 import pytest
+from django.db import connection
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 
@@ -55,6 +58,18 @@ def create_user(**params):
     return get_user_model().objects.create_user(**params)
 
 
+@contextmanager
+def query_budget(budget):
+    """Fail if the enclosed block runs more than `budget` queries."""
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    executed = len(context.captured_queries)
+    queries = "\n".join(query["sql"] for query in context.captured_queries)
+    assert executed <= budget, (
+        f"{executed} queries executed, budget is {budget}:\n{queries}"
+    )
+
+
 def create_recipe(user, **params):
     """Create and return a sample recipe."""
     defaults = {
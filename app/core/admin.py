@@ -39,7 +39,28 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class RecipeTagInline(admin.TabularInline):
+    """Edit the tags of a recipe."""
+
+    model = models.RecipeTag
+    extra = 0
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    """Edit the ingredients of a recipe."""
+
+    model = models.RecipeIngredient
+    extra = 0
+
+
+class RecipeAdmin(admin.ModelAdmin):
+    """Define the admin pages for recipes."""
+
+    inlines = [RecipeTagInline, RecipeIngredientInline]
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
+admin.site.register(models.Recipe, RecipeAdmin)
 admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
+admin.site.register(models.RecipeImport)
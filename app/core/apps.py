@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import authentication, checks  # noqa
+        from core import storage
+
+        if settings.RECIPE_IMAGE_CONTENT_ADDRESSED:
+            storage.connect_reference_counting()
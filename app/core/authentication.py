@@ -0,0 +1,56 @@
+"""
+Authentication for the APIs.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+AUTH_CACHE_ALIAS = "auth"
+
+
+def token_cache_key(key):
+    """Return the cache key of a token."""
+    return f"token:{key}"
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication caching the token to user lookup.
+
+    Resolved users are kept in the `auth` cache, a bounded in-process LRU
+    with a TTL by default. Entries are invalidated when a token is deleted
+    or its user is saved or updated through a queryset, which covers
+    deactivation and edits through the user API. Invalidation only reaches
+    other processes through a shared cache, which deployments running
+    several workers must configure (see `core.checks`).
+    """
+
+    def authenticate_credentials(self, key):
+        """Return the cached user and token, or look them up and cache them."""
+        cache = caches[AUTH_CACHE_ALIAS]
+        credentials = cache.get(token_cache_key(key))
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            cache.set(token_cache_key(key), credentials)
+        return credentials
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Drop a deleted token from the cache."""
+    caches[AUTH_CACHE_ALIAS].delete(token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Drop the tokens of a saved user from the cache."""
+    if not created:
+        keys = Token.objects.filter(user=instance).values_list("key", flat=True)
+        invalidate_credentials(keys)
+
+
+def invalidate_credentials(keys):
+    """Drop the tokens with `keys` from the cache."""
+    caches[AUTH_CACHE_ALIAS].delete_many([token_cache_key(key) for key in keys])
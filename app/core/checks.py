@@ -0,0 +1,23 @@
+"""
+System checks for the app.
+"""
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_auth_cache(app_configs, **kwargs):
+    """Warn when cached credentials cannot be invalidated across processes."""
+    if settings.CACHES["auth"]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        checks.Warning(
+            "The auth cache is local to each process, so a deleted token or "
+            "deactivated user stays valid on the other workers for up to "
+            "AUTH_CACHE_TIMEOUT seconds.",
+            hint="Set CACHE_BACKEND and CACHE_LOCATION to a shared cache.",
+            id="core.W001",
+        )
+    ]
@@ -0,0 +1,100 @@
+"""
+Content encodings shared by response compression and static files.
+"""
+import gzip
+import zlib
+from functools import partial
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Uncompressed bytes buffered by streamed compression between flushes. Each
+# flush ends a compression block, so flushing small chunks hurts the ratio.
+STREAM_FLUSH_BYTES = 32 * 1024
+
+
+def available_encodings():
+    """Return the supported content encodings, preferred first."""
+    return ("br", "gzip") if brotli else ("gzip",)
+
+
+def accepted_encodings(header):
+    """Return the q-value of each coding listed in an Accept-Encoding header."""
+    accepted = {}
+    for item in header.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+    return accepted
+
+
+def select_encoding(header):
+    """Return the best encoding accepted by an Accept-Encoding header.
+
+    Codings refused with `q=0`, and all others when `*` is refused, are not
+    used. Ties go to the preferred encoding. Returns None when the response
+    should be sent as is.
+    """
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, static=False):
+    """Compress `data` bytes with `encoding`.
+
+    Static files are compressed once ahead of time, so they use the highest
+    levels; responses use the faster levels from the settings.
+    """
+    if encoding == "br":
+        quality = 11 if static else settings.COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(data, quality=quality)
+    level = 9 if static else settings.COMPRESSION_GZIP_LEVEL
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of byte chunks with `encoding`.
+
+    The output is flushed every `STREAM_FLUSH_BYTES` of input, so the
+    client receives data as it is produced without a block per chunk.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        process, flush = compressor.process, compressor.flush
+        finish = compressor.finish
+    else:
+        # A gzip member written with zlib, so the output can be sync flushed.
+        compressor = zlib.compressobj(
+            settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31
+        )
+        process = compressor.compress
+        flush = partial(compressor.flush, zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    output, pending = [], 0
+    for chunk in chunks:
+        output.append(process(chunk))
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            output.append(flush())
+            yield b"".join(output)
+            output, pending = [], 0
+    output.append(finish())
+    yield b"".join(output)
@@ -0,0 +1,81 @@
+"""
+PostgreSQL backend keeping connections open in a pool per process.
+
+Django opens a connection on the first query of a request and closes it
+at the end (CONN_MAX_AGE 0). With this backend opening takes a pooled
+connection and closing returns it, so worker threads share a bounded set
+of persistent connections. Pool options are read from the "POOL" dict
+of the database settings:
+
+- MAX_SIZE: connections per process.
+- TIMEOUT: seconds to wait for a free connection before failing.
+- MAX_LIFETIME: seconds after which a connection is closed on return.
+- CHECK_AFTER: seconds of idleness after which a connection is pinged
+  before use.
+"""
+from functools import partial
+
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from core.db import pool
+from core.db.backends.postgresql_pool.creation import DatabaseCreation
+
+POOL_DEFAULTS = {
+    "MAX_SIZE": 10,
+    "TIMEOUT": 30,
+    "MAX_LIFETIME": 3600,
+    "CHECK_AFTER": 30,
+}
+
+
+def connect(conn_params, isolation_level=None):
+    """Open a connection set up like the PostgreSQL backend does.
+
+    Pools are shared by the threads of a process, so connections are
+    opened without reference to the database wrapper that asked first.
+    """
+    connection = base.Database.connect(**conn_params)
+    if isolation_level is not None and isolation_level != connection.isolation_level:
+        connection.set_session(isolation_level=isolation_level)
+    # Skip the round trip through json.loads(), as the backend does.
+    psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+    return connection
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL database wrapper taking connections from a pool."""
+
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        """Return the pool of connections opened with `conn_params`."""
+        options = {**POOL_DEFAULTS, **self.settings_dict.get("POOL", {})}
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        return pool.get_pool(
+            (self.alias, tuple(sorted(conn_params.items()))),
+            connect=partial(connect, conn_params, isolation_level),
+            max_size=options["MAX_SIZE"],
+            timeout=options["TIMEOUT"],
+            max_lifetime=options["MAX_LIFETIME"],
+            check_after=options["CHECK_AFTER"],
+        )
+
+    def get_new_connection(self, conn_params):
+        """Take a connection from the pool."""
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.getconn()
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        """Return the connection to its pool instead of closing it.
+
+        After a database error the connection is checked before it is
+        reused, as it may be broken without being marked closed.
+        """
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection, check=self.errors_occurred)
@@ -0,0 +1,14 @@
+"""
+Test database creation for the pooled PostgreSQL backend.
+"""
+from django.db.backends.postgresql import creation
+
+from core.db import pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Close pooled connections before a test database is dropped."""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        pool.close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
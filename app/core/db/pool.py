@@ -0,0 +1,223 @@
+"""
+Thread-safe pool of database connections with health checks and statistics.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Pools inherited from a parent process. Their connections are kept
+# referenced, as closing them on garbage collection would end the
+# parent's sessions.
+_inherited_pools = []
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became available within the pool timeout."""
+
+
+class ConnectionPool:
+    """Pool of up to `max_size` connections opened with `connect`.
+
+    Connections are opened on demand and reused most recently returned
+    first. A connection idle for more than `check_after` seconds is pinged
+    before it is handed out, and one older than `max_lifetime` seconds is
+    closed instead of being reused. When all connections are in use,
+    `getconn` waits up to `timeout` seconds for one to be returned.
+    """
+
+    def __init__(self, connect, max_size, timeout, max_lifetime, check_after):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.pid = os.getpid()
+        self._condition = threading.Condition()
+        # Idle connections as (connection, opened, returned) tuples.
+        self._idle = deque()
+        # Open time of the connections by id, and connections being opened.
+        self._opened = {}
+        self._opening = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "opened": 0,
+            "closed": 0,
+            "failed_checks": 0,
+            "checkout_ms_total": 0.0,
+            "checkout_ms_max": 0.0,
+        }
+
+    def getconn(self):
+        """Return a healthy connection, opening one if there is room."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        while True:
+            with self._condition:
+                while not self._idle and self._full():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No database connection available in {self.timeout}s "
+                            f"({self.max_size} in use)."
+                        )
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                    self._condition.wait(remaining)
+                if self._idle:
+                    connection, opened, returned = self._idle.pop()
+                else:
+                    connection, opened, returned = None, None, None
+                    # Reserve the slot while connecting outside the lock.
+                    self._opening += 1
+            if connection is None:
+                connection = self._open()
+            elif not self._usable(connection, opened, returned):
+                self._discard(connection)
+                continue
+            self._record_checkout(start)
+            return connection
+
+    def putconn(self, connection, check=False):
+        """Return a connection to the pool, or close it if it is not reusable.
+
+        With `check`, the connection is also pinged once rolled back.
+        """
+        with self._condition:
+            opened = self._opened.get(id(connection))
+        try:
+            reusable = (
+                opened is not None
+                and not connection.closed
+                and time.monotonic() - opened < self.max_lifetime
+            )
+            if reusable:
+                status = connection.info.transaction_status
+                if status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+                connection.autocommit = True
+                if check:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+        except psycopg2.Error:
+            reusable = False
+        if not reusable:
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, opened, time.monotonic()))
+            self._condition.notify()
+
+    def close(self):
+        """Close the idle connections. Connections in use are closed on return."""
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+        for connection, opened, returned in idle:
+            self._discard(connection)
+
+    def stats(self):
+        """Return the pool size, usage and checkout statistics."""
+        with self._condition:
+            stats = dict(self._stats)
+            stats["size"] = len(self._opened)
+            stats["idle"] = len(self._idle)
+        stats["in_use"] = stats["size"] - stats["idle"]
+        stats["max_size"] = self.max_size
+        checkout_ms_total = stats.pop("checkout_ms_total")
+        stats["checkout_ms_avg"] = (
+            checkout_ms_total / stats["checkouts"] if stats["checkouts"] else 0.0
+        )
+        return stats
+
+    def _full(self):
+        """Return whether no connection can be opened. Call with the lock held."""
+        return len(self._opened) + self._opening >= self.max_size
+
+    def _open(self):
+        """Open a connection in the slot reserved by `getconn`."""
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._condition:
+                self._opening -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opening -= 1
+            self._opened[id(connection)] = time.monotonic()
+            self._stats["opened"] += 1
+        return connection
+
+    def _usable(self, connection, opened, returned):
+        """Return whether an idle connection can be handed out."""
+        now = time.monotonic()
+        if connection.closed or now - opened >= self.max_lifetime:
+            return False
+        if now - returned < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            with self._condition:
+                self._stats["failed_checks"] += 1
+            return False
+
+    def _discard(self, connection):
+        """Close a connection and free its slot."""
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self._condition:
+            if self._opened.pop(id(connection), None) is not None:
+                self._stats["closed"] += 1
+            self._condition.notify()
+
+    def _record_checkout(self, start):
+        """Count a checkout and how long it took."""
+        elapsed = (time.monotonic() - start) * 1000
+        with self._condition:
+            self._stats["checkouts"] += 1
+            self._stats["checkout_ms_total"] += elapsed
+            self._stats["checkout_ms_max"] = max(
+                self._stats["checkout_ms_max"], elapsed
+            )
+
+
+def get_pool(key, **options):
+    """Return the pool of this process for `key`, creating it if needed.
+
+    Pools inherited from a parent process are replaced, without closing
+    their connections, which still belong to the parent.
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                _inherited_pools.append(pool)
+            pool = _pools[key] = ConnectionPool(**options)
+        return pool
+
+
+def all_pools():
+    """Return the pools of this process by key."""
+    with _pools_lock:
+        return {key: pool for key, pool in _pools.items() if pool.pid == os.getpid()}
+
+
+def close_pools():
+    """Close the idle connections of all pools of this process."""
+    for pool in all_pools().values():
+        pool.close()
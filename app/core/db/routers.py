@@ -0,0 +1,72 @@
+"""
+Routing of API reads to read replicas, with read-your-writes pinning.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# The replica serving the reads of the current request, if any. Being a
+# context variable, it follows the request into `sync_to_async` threads.
+replica_alias = ContextVar("replica_alias", default=None)
+
+
+def choose_replica():
+    """Return a replica to serve the reads of a request."""
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def _pin_key(user):
+    return f"db-primary-pin:{user.pk}"
+
+
+def pin_to_primary(user):
+    """Send the reads of a user to the primary for `DB_REPLICA_PIN_SECONDS`.
+
+    The pin is kept in the default cache, which settings require to be
+    shared between processes when replicas are configured.
+    """
+    if settings.DATABASE_REPLICAS:
+        cache.set(_pin_key(user), True, settings.DB_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    """Return whether the reads of a user must go to the primary."""
+    return cache.get(_pin_key(user), False)
+
+
+class ReplicaRouter:
+    """Route reads to the replica in `replica_alias` while it is set.
+
+    A request reads from a single replica, so its response reflects one
+    point in time. Everything else goes to the primary, writes included, so
+    an object read from a replica is saved on the primary. Reads of related
+    objects stay on the replica the instance came from. Only the primary is
+    migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        """Return the replica of the request when set, the primary otherwise."""
+        replicas = settings.DATABASE_REPLICAS
+        alias = replica_alias.get()
+        if alias not in replicas:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in replicas:
+            return instance._state.db
+        return alias
+
+    def db_for_write(self, model, **hints):
+        """Return the primary."""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations between objects of the primary and its replicas."""
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, **hints):
+        """Only migrate the primary, replicas follow it."""
+        return db == DEFAULT_DB_ALIAS
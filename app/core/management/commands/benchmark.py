@@ -0,0 +1,378 @@
+"""
+Django command to benchmark the recipe API code paths.
+"""
+import asyncio
+import itertools
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import BytesIO
+from typing import Any
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.backends.signals import connection_created
+from django.core.handlers.asgi import ASGIHandler
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import ORJSONParser, ORJSONRenderer
+from recipe import bulk, serializers
+from recipe.views import RecipeViewSet
+
+BENCHMARK_EMAIL = "benchmark@example.com"
+
+
+def median_ms(func, repeat):
+    """Return the median run time of `func` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the recipe API against sample data.
+
+    Sample data is created and analyzed for a throwaway user, which is
+    deleted with all its data at the end.
+    """
+
+    help = "Benchmark recipe API code paths against generated data."
+    scenarios = ["filters", "serializers", "json", "concurrency"]
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenario", choices=self.scenarios)
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument("--attrs", type=int, default=200)
+        parser.add_argument("--links", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--query-delay", type=float, default=0)
+
+    def handle(self, *args: Any, **options: Any):
+        """Entrypoint for command."""
+        self.options = options
+        with transaction.atomic():
+            user = self.create_data()
+        try:
+            self.analyze()
+            getattr(self, f"bench_{options['scenario']}")(user)
+        finally:
+            user.delete()
+
+    def create_data(self):
+        """Create a user with recipes linked to random tags and ingredients.
+
+        The user left behind by an interrupted run is deleted first.
+        """
+        get_user_model().objects.filter(email=BENCHMARK_EMAIL).delete()
+        user = get_user_model().objects.create_user(
+            email=BENCHMARK_EMAIL, password="benchmark"
+        )
+        rng = random.Random(0)
+        tags = Tag.objects.bulk_create(
+            [Tag(user=user, name=f"Tag {i}") for i in range(self.options["attrs"])]
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            [
+                Ingredient(user=user, name=f"Ingredient {i}")
+                for i in range(self.options["attrs"])
+            ]
+        )
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    user=user,
+                    title=f"Recipe {i}",
+                    description="Benchmark recipe " * 20,
+                    time_minutes=rng.randint(5, 120),
+                    price=Decimal(rng.randint(100, 9999)) / 100,
+                )
+                for i in range(self.options["recipes"])
+            ]
+        )
+        for field, attrs in (("tag", tags), ("ingredient", ingredients)):
+            through = getattr(Recipe, f"{field}s").through
+            through.objects.bulk_create(
+                [
+                    through(recipe_id=recipe.id, **{f"{field}_id": attr.id})
+                    for recipe in recipes
+                    for attr in rng.sample(attrs, self.options["links"])
+                ]
+            )
+        self.stdout.write(
+            f"Created {len(recipes)} recipes with {len(tags)} tags "
+            f"and {len(ingredients)} ingredients."
+        )
+        self.tags = tags
+        return user
+
+    def analyze(self):
+        """Update the planner statistics of the recipe tables."""
+        models = [
+            Recipe,
+            Recipe.tags.through,
+            Recipe.ingredients.through,
+            Tag,
+            Ingredient,
+        ]
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def recipe_view(self, user, params=None, action="list"):
+        """Return a recipe viewset for a GET request with `params`."""
+        request = Request(APIRequestFactory().get("/", params or {}))
+        request.user = user
+        view = RecipeViewSet(request=request, action=action, format_kwarg=None)
+        return view
+
+    def bench_filters(self, user):
+        """Compare tag filters as JOIN + DISTINCT and as semijoins.
+
+        Each query is timed for the full result and for a first page of
+        100 recipes.
+        """
+        self.stdout.write(
+            "tags  join+distinct  any            all            (ms, median)"
+        )
+        self.stdout.write("      full    page   full    page   full    page")
+        for size in (1, 2, 5, 10, 25, 50):
+            tag_ids = [tag.id for tag in self.tags[:size]]
+            param = ",".join(str(tag_id) for tag_id in tag_ids)
+            querysets = [
+                Recipe.objects.filter(user=user, tags__id__in=tag_ids)
+                .order_by("-id")
+                .distinct()
+            ]
+            for match in ("any", "all"):
+                view = self.recipe_view(user, {"tags": param, "match": match})
+                querysets.append(view.get_queryset().prefetch_related(None))
+
+            timings = []
+            repeat = self.options["repeat"]
+            for queryset in querysets:
+                ids = queryset.values_list("id", flat=True)
+                timings.append(median_ms(lambda: list(ids.all()), repeat))
+                timings.append(median_ms(lambda: list(ids[:100]), repeat))
+            self.stdout.write(
+                f"{size:<6}" + "".join(f"{timing:<8.2f}" for timing in timings)
+            )
+
+    def bench_serializers(self, user):
+        """Compare list serialization with model serializers and plain rows.
+
+        Times are per recipe for a page of 1000 recipes, for serialization
+        alone and including the queries.
+        """
+        size = min(1000, self.options["recipes"])
+        repeat = self.options["repeat"]
+        queryset = self.recipe_view(user).get_queryset()
+        row_serializer = serializers.RowSerializer(serializers.RecipeSerializer)
+        values = queryset.prefetch_related(None).values(*row_serializer.value_fields)
+
+        def serialize_instances(instances):
+            return serializers.RecipeSerializer(instances, many=True).data
+
+        def load_rows():
+            return bulk.add_recipe_attrs(list(values.all()[:size]))
+
+        instances = list(queryset.all()[:size])
+        rows = load_rows()
+        timings = [
+            median_ms(lambda: serialize_instances(instances), repeat),
+            median_ms(lambda: row_serializer.to_representation(rows), repeat),
+            median_ms(lambda: serialize_instances(list(queryset.all()[:size])), repeat),
+            median_ms(lambda: row_serializer.to_representation(load_rows()), repeat),
+        ]
+
+        self.stdout.write("path         serialize  with queries  (us per recipe, median)")
+        for label, serialize, total in (
+            ("serializer", timings[0], timings[2]),
+            ("rows", timings[1], timings[3]),
+        ):
+            self.stdout.write(
+                f"{label:<13}{serialize * 1000 / size:<11.1f}{total * 1000 / size:.1f}"
+            )
+
+    def bench_json(self, user):
+        """Compare DRF's JSON renderer and parser with the orjson ones.
+
+        The payload is a list page of up to 1000 recipes, rendered as a
+        response and parsed as a batch request body.
+        """
+        size = min(1000, self.options["recipes"])
+        repeat = self.options["repeat"]
+        row_serializer = serializers.RowSerializer(serializers.RecipeSerializer)
+        values = (
+            self.recipe_view(user)
+            .get_queryset()
+            .prefetch_related(None)
+            .values(*row_serializer.value_fields)
+        )
+        payload = row_serializer.to_representation(
+            bulk.add_recipe_attrs(list(values[:size]))
+        )
+        body = JSONRenderer().render(payload)
+
+        self.stdout.write(f"{len(body)} bytes for {len(payload)} recipes")
+        self.stdout.write("library  render  parse  (ms, median)")
+        for label, renderer, parser in (
+            ("stdlib", JSONRenderer(), JSONParser()),
+            ("orjson", ORJSONRenderer(), ORJSONParser()),
+        ):
+            render = median_ms(lambda: renderer.render(payload), repeat)
+            parse = median_ms(lambda: parser.parse(BytesIO(body)), repeat)
+            self.stdout.write(f"{label:<9}{render:<8.2f}{parse:.2f}")
+
+    def bench_concurrency(self, user):
+        """Compare concurrent recipe list requests on WSGI and ASGI.
+
+        `--concurrency` requests for pages of 100 recipes are sent at once,
+        each with its own query string so none is served from the response
+        cache. WSGI serves them with `--workers` threads, like the uWSGI
+        workers. The ASGI application serves the sync viewset, in a new
+        thread per request, and the async view, in the offload pool.
+        `--query-delay` adds that many milliseconds to every query, as a
+        stand-in for a remote or loaded database. `conns` is the peak number
+        of database connections open at once.
+        """
+        token = Token.objects.create(user=user)
+        count = self.options["concurrency"]
+        delay = self.options["query_delay"] / 1000
+
+        def delay_query(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            if (
+                delay
+                and threading.current_thread().name != "benchmark-sampler"
+                and delay_query not in connection.execute_wrappers
+            ):
+                connection.execute_wrappers.append(delay_query)
+
+        def open_connections():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE datname = current_database()"
+                )
+                return cursor.fetchone()[0]
+
+        def peak_connections(run):
+            """Call `run` and return its result and the peak extra connections."""
+            started, stop = threading.Event(), threading.Event()
+            counts = []
+
+            def sample():
+                try:
+                    counts.append(open_connections())
+                    started.set()
+                    while not stop.wait(0.002):
+                        counts.append(open_connections())
+                finally:
+                    connection.close()
+
+            sampler = threading.Thread(target=sample, name="benchmark-sampler")
+            sampler.start()
+            started.wait()
+            try:
+                return run(), max(counts) - counts[0]
+            finally:
+                stop.set()
+                sampler.join()
+
+        request_ids = itertools.count()
+
+        def queries():
+            return [f"page_size=100&request={next(request_ids)}" for _ in range(count)]
+
+        def wsgi_get(path):
+            start = time.perf_counter()
+            try:
+                Client().get(path, HTTP_AUTHORIZATION=f"Token {token.key}")
+            finally:
+                connection.close()
+            return (time.perf_counter() - start) * 1000
+
+        def run_wsgi(path):
+            paths = [f"{path}?{query}" for query in queries()]
+            with ThreadPoolExecutor(self.options["workers"]) as pool:
+                return list(pool.map(wsgi_get, paths))
+
+        async def asgi_get(application, path, query):
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "query_string": query.encode(),
+                "headers": [
+                    (b"host", b"testserver"),
+                    (b"authorization", f"Token {token.key}".encode()),
+                ],
+            }
+
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                pass
+
+            start = time.perf_counter()
+            await application(scope, receive, send)
+            return (time.perf_counter() - start) * 1000
+
+        async def asgi_requests(path):
+            application = ASGIHandler()
+            return await asyncio.gather(
+                *(asgi_get(application, path, query) for query in queries())
+            )
+
+        sync_path = reverse("recipe:recipe-list")
+        async_path = reverse("recipe:async-recipe-list")
+        setups = [
+            (f"wsgi x{self.options['workers']}", lambda: run_wsgi(sync_path)),
+            ("asgi sync", lambda: asyncio.run(asgi_requests(sync_path))),
+            ("asgi async", lambda: asyncio.run(asgi_requests(async_path))),
+        ]
+        results = {label: ([], [], []) for label, run in setups}
+        connection_created.connect(add_delay)
+        try:
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                for _ in range(self.options["repeat"]):
+                    for label, run in setups:
+                        totals, latencies, peaks = results[label]
+                        start = time.perf_counter()
+                        run_latencies, peak = peak_connections(run)
+                        totals.append((time.perf_counter() - start) * 1000)
+                        latencies += run_latencies
+                        peaks.append(peak)
+        finally:
+            connection_created.disconnect(add_delay)
+
+        self.stdout.write(f"{count} concurrent requests of 100 recipes, medians")
+        self.stdout.write("setup        total    req/s   p50      p95      conns")
+        for label, (totals, latencies, peaks) in results.items():
+            total = statistics.median(totals)
+            p95 = statistics.quantiles(latencies, n=20)[-1] if count > 1 else total
+            self.stdout.write(
+                f"{label:<13}{total:<9.1f}{count * 1000 / total:<8.1f}"
+                f"{statistics.median(latencies):<9.1f}{p95:<9.1f}"
+                f"{max(peaks)}"
+            )
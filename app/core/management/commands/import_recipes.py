@@ -0,0 +1,70 @@
+"""
+Django command to import recipes from an NDJSON or CSV file.
+"""
+from typing import Any
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import RecipeImport
+from recipe import importer
+from recipe.serializers import RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    """Django command to import recipes for a user."""
+
+    help = "Import recipes from an NDJSON or CSV file, resumable per chunk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--user", required=True, help="Email of the owner.")
+        parser.add_argument("--format", choices=importer.FORMATS)
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--resume", type=int, help="Id of an interrupted import to continue."
+        )
+
+    def handle(self, *args: Any, **options: Any):
+        """Entrypoint for command."""
+        try:
+            user = get_user_model().objects.get(email=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}.")
+
+        if options["resume"]:
+            try:
+                job = RecipeImport.objects.get(
+                    id=options["resume"], user=user, finished=False
+                )
+            except RecipeImport.DoesNotExist:
+                raise CommandError(f"No unfinished import {options['resume']}.")
+            self.stdout.write(f"Resuming import {job.id} after row {job.rows_done}.")
+        else:
+            job = RecipeImport.objects.create(user=user, source=options["path"])
+            self.stdout.write(f"Started import {job.id}.")
+
+        file_format = options["format"] or importer.detect_format(options["path"])
+        with open(options["path"], "rb") as stream:
+            importer.import_recipes(
+                job,
+                importer.parse_rows(stream, file_format),
+                RecipeDetailSerializer(),
+                chunk_size=options["chunk_size"],
+                on_chunk=self.report_chunk,
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {job.created} recipes, {job.failed} rows failed."
+            )
+        )
+
+    def report_chunk(self, job, errors):
+        """Write the progress and errors of an imported chunk."""
+        for row, detail in errors:
+            self.stderr.write(f"Row {row}: {detail}")
+        self.stdout.write(
+            f"{job.rows_done} rows processed "
+            f"({job.created} created, {job.failed} failed)."
+        )
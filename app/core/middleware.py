@@ -0,0 +1,59 @@
+"""
+Middleware for the app.
+"""
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core import compression
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with brotli or gzip, as negotiated with the client.
+
+    Only responses with a content type in `COMPRESSION_CONTENT_TYPES` are
+    compressed, and in memory ones only from `COMPRESSION_MIN_SIZE` bytes,
+    as smaller payloads gain little for the CPU spent. Streaming responses
+    are compressed chunk by chunk. ETags are made weak, as the bytes sent
+    depend on the encoding.
+    """
+
+    def process_response(self, request, response):
+        """Compress the response if allowed and accepted by the client."""
+        if response.has_header("Content-Encoding") or not self._allowed(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = compression.select_encoding(
+            request.headers.get("Accept-Encoding", "")
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                response.streaming_content, encoding
+            )
+            del response["Content-Length"]
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            compressed = compression.compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        if response.has_header("ETag"):
+            response["ETag"] = re.sub(r'^"', 'W/"', response["ETag"])
+        response["Content-Encoding"] = encoding
+        return response
+
+    def _allowed(self, response):
+        """Return whether the response is worth compressing."""
+        if response.status_code < 200 or response.status_code in (204, 304):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        return content_type.lower() in settings.COMPRESSION_CONTENT_TYPES
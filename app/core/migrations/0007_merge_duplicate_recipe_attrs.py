@@ -0,0 +1,50 @@
+# Generated by Django 4.0.10 on 2026-10-17 06:28
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags and ingredients sharing a name for the same user."""
+    Recipe = apps.get_model("core", "Recipe")
+    for field_name in ("tags", "ingredients"):
+        field = Recipe._meta.get_field(field_name)
+        model = field.related_model
+        through = field.remote_field.through
+        target = f"{model._meta.model_name}_id"
+
+        duplicates = (
+            model.objects.values("user", "name")
+            .annotate(keep=Min("id"), count=Count("id"))
+            .filter(count__gt=1)
+        )
+        for duplicate in duplicates:
+            others = list(
+                model.objects.filter(user=duplicate["user"], name=duplicate["name"])
+                .exclude(id=duplicate["keep"])
+                .values_list("id", flat=True)
+            )
+            rows = through.objects.filter(**{f"{target}__in": others})
+            linked = through.objects.filter(**{target: duplicate["keep"]}).values(
+                "recipe_id"
+            )
+            rows.filter(recipe_id__in=linked).delete()
+            first_rows = list(
+                rows.values("recipe_id").annotate(row=Min("id")).values_list(
+                    "row", flat=True
+                )
+            )
+            rows.exclude(id__in=first_rows).delete()
+            rows.update(**{target: duplicate["keep"]})
+            model.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
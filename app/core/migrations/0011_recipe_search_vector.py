@@ -0,0 +1,57 @@
+# Generated by Django 4.0.10 on 2026-10-17 06:39
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vectors(apps, schema_editor):
+    """Compute the search vector of existing recipes."""
+    Recipe = apps.get_model("core", "Recipe")
+
+    def names(model_name):
+        model = apps.get_model("core", model_name)
+        return Subquery(
+            model.objects.filter(recipe=OuterRef("pk"))
+            .values("recipe")
+            .annotate(names=StringAgg("name", " "))
+            .values("names")
+        )
+
+    Recipe.objects.update(
+        search_vector=(
+            SearchVector("title", weight="A")
+            + SearchVector("description", weight="B")
+            + SearchVector(names("Tag"), weight="C")
+            + SearchVector(names("Ingredient"), weight="C")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    # The index is built concurrently, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_user_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            populate_search_vectors, migrations.RunPython.noop, atomic=True
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.0.10 on 2026-10-17 08:13
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Add indexes for the per-user recipe queries without locking writes.
+
+    Tags and ingredients are already covered by the (user, name) unique
+    constraints. The join tables only have a (recipe_id, attr_id) index,
+    so a reverse (attr_id, recipe_id) index is added for the filters. The
+    join tables become explicit through models first, without touching the
+    database, so that their indexes are part of the model state.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ("core", "0011_recipe_search_vector"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "-id"], name="recipe_user_id_desc_idx"
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="RecipeTag",
+                    fields=[
+                        ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                        ("recipe", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.recipe")),
+                        ("tag", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.tag")),
+                    ],
+                    options={
+                        "db_table": "core_recipe_tags",
+                        "unique_together": {("recipe", "tag")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="recipe",
+                    name="tags",
+                    field=models.ManyToManyField(through="core.RecipeTag", to="core.tag"),
+                ),
+                migrations.CreateModel(
+                    name="RecipeIngredient",
+                    fields=[
+                        ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                        ("recipe", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.recipe")),
+                        ("ingredient", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.ingredient")),
+                    ],
+                    options={
+                        "db_table": "core_recipe_ingredients",
+                        "unique_together": {("recipe", "ingredient")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="recipe",
+                    name="ingredients",
+                    field=models.ManyToManyField(through="core.RecipeIngredient", to="core.ingredient"),
+                ),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name="recipetag",
+            index=models.Index(
+                fields=["tag", "recipe"], name="recipe_tags_tag_recipe_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="recipeingredient",
+            index=models.Index(
+                fields=["ingredient", "recipe"], name="recipe_ingr_ingr_recipe_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-17 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.10 on 2026-10-17 09:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Index recipe images, looked up before a shared blob is deleted."""
+
+    atomic = False
+
+    dependencies = [
+        ("core", "0015_alter_user_data_version"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="recipe",
+            index=models.Index(
+                condition=models.Q(("image__isnull", False)),
+                fields=["image"],
+                name="recipe_image_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+"""
+View mixins for the app.
+"""
+from django.conf import settings
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db import routers
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from a read replica, keeping read-your-writes.
+
+    Once the request is authenticated, reads of safe requests go to one
+    replica chosen for the request, unless the user wrote within the last `DB_REPLICA_PIN_SECONDS`
+    and the replicas may not have the change yet. Successful writes go to
+    the primary and start that window.
+    """
+
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        """Read from a replica for safe requests of users not pinned."""
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and not routers.is_pinned(request.user)
+        ):
+            self._replica_token = routers.replica_alias.set(routers.choose_replica())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Stop reading from the replica, or pin the user after a write."""
+        if self._replica_token is not None:
+            routers.replica_alias.reset(self._replica_token)
+            self._replica_token = None
+        elif (
+            request.method not in SAFE_METHODS
+            and status.is_success(response.status_code)
+            and request.user.is_authenticated
+        ):
+            routers.pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -4,6 +4,8 @@ Database models.
 import uuid
 import os
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models  # noqa
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -11,6 +13,8 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 
+from core.storage import recipe_image_storage
+
 
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image."""
@@ -20,7 +24,28 @@ def recipe_image_file_path(instance, filename):
     return os.path.join("uploads", "recipe", filename)
 
 
-class UserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    """Queryset for users."""
+
+    def update(self, **kwargs):
+        """Update the users, dropping their cached credentials.
+
+        Updates bypass `post_save`, so the tokens are invalidated here. Bumps
+        of the data version alone leave them cached.
+        """
+        if kwargs.keys() <= {"data_version"}:
+            return super().update(**kwargs)
+        from rest_framework.authtoken.models import Token
+
+        from core.authentication import invalidate_credentials
+
+        keys = list(Token.objects.filter(user__in=self).values_list("key", flat=True))
+        rows = super().update(**kwargs)
+        invalidate_credentials(keys)
+        return rows
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """Manager for users."""
 
     def create_user(self, email, password=None, **extra_fields):
@@ -44,6 +69,25 @@ class UserManager(BaseUserManager):
         return user
 
 
+class RecipeAttrManager(models.Manager):
+    """Manager for recipe attributes (tags and ingredients)."""
+
+    def get_or_create_many(self, user, names):
+        """Return a name to object mapping, creating missing names in bulk."""
+        names = set(names)
+        objs = {obj.name: obj for obj in self.filter(user=user, name__in=names)}
+        missing = names - objs.keys()
+        if missing:
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            objs.update(
+                (obj.name, obj) for obj in self.filter(user=user, name__in=missing)
+            )
+        return objs
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     """User in the system."""
 
@@ -51,11 +95,30 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    data_version = models.PositiveIntegerField(default=0, editable=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = "email"
 
+    def save(self, *args, **kwargs):
+        """Save the user, leaving the data version out of updates.
+
+        The version is only bumped by queryset updates. An instance loaded
+        earlier holds an old version, which a full save would write back.
+        """
+        if not self._state.adding and not kwargs.get("force_insert"):
+            if kwargs.get("update_fields") is None:
+                deferred = self.get_deferred_fields()
+                kwargs["update_fields"] = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.name != "data_version"
+                    and field.attname not in deferred
+                ]
+        super().save(*args, **kwargs)
+
 
 class Recipe(models.Model):
     """Recipe object."""
@@ -66,9 +129,24 @@ class Recipe(models.Model):
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
-    tags = models.ManyToManyField("Tag")
-    ingredients = models.ManyToManyField("Ingredient")
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    tags = models.ManyToManyField("Tag", through="RecipeTag")
+    ingredients = models.ManyToManyField("Ingredient", through="RecipeIngredient")
+    image = models.ImageField(
+        null=True, upload_to=recipe_image_file_path, storage=recipe_image_storage
+    )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="recipe_search_vector_idx"),
+            models.Index(fields=["user", "-id"], name="recipe_user_id_desc_idx"),
+            models.Index(
+                fields=["image"],
+                name="recipe_image_idx",
+                condition=models.Q(image__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -80,6 +158,15 @@ class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,)
 
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_tag_name_per_user"
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -90,5 +177,60 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,)
 
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_ingredient_name_per_user"
+            ),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class RecipeTag(models.Model):
+    """Link between a recipe and a tag."""
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = "core_recipe_tags"
+        unique_together = [("recipe", "tag")]
+        indexes = [
+            models.Index(fields=["tag", "recipe"], name="recipe_tags_tag_recipe_idx"),
+        ]
+
+
+class RecipeIngredient(models.Model):
+    """Link between a recipe and an ingredient."""
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = "core_recipe_ingredients"
+        unique_together = [("recipe", "ingredient")]
+        indexes = [
+            models.Index(
+                fields=["ingredient", "recipe"], name="recipe_ingr_ingr_recipe_idx"
+            ),
+        ]
+
+
+class RecipeImport(models.Model):
+    """Progress of a recipe import, saved with each imported chunk."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,)
+    source = models.CharField(max_length=255)
+    rows_done = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} ({self.rows_done} rows)"
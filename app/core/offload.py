@@ -0,0 +1,66 @@
+"""
+Run blocking work from async views in a pool of worker threads.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+
+
+def get_executor():
+    """Return the worker pool, created on first use in each process."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_THREAD_WORKERS,
+            thread_name_prefix="async-offload",
+        )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    """Call `func`, then release the database connection of the thread."""
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """Run the blocking `func` in the worker pool and return its result.
+
+    Under Django's ASGI handler, sync code runs in a thread per request,
+    each holding its own database connection, with no limit on either. The
+    pool caps the threads at `ASYNC_THREAD_WORKERS`, so concurrent calls
+    never hold more connections than the database pool provides.
+    """
+    return await sync_to_async(
+        _call, thread_sensitive=False, executor=get_executor()
+    )(func, args, kwargs)
+
+
+def _render(view, request, args, kwargs):
+    """Call a sync view and render its response."""
+    response = view(request, *args, **kwargs)
+    if callable(getattr(response, "render", None)):
+        response = response.render()
+    return response
+
+
+def offloaded(view):
+    """Return an async view running the sync `view` in the worker pool.
+
+    The response is rendered in the worker too, so serialization, queries
+    made while rendering, image processing and password hashing never run
+    on the event loop or hold up the other requests.
+    """
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run_in_thread(_render, view, request, args, kwargs)
+
+    return async_view
@@ -0,0 +1,64 @@
+"""
+Fast JSON renderer and parser for the APIs.
+"""
+from django.conf import settings
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSON renderer using orjson, with the output of DRF's JSONRenderer.
+
+    Datetimes and the types orjson does not know, such as `Decimal` and
+    lazy translation strings, are converted by DRF's JSON encoder, and
+    U+2028/U+2029 are escaped like DRF does. Indented output, and all
+    output when orjson is not installed, falls back to the stdlib renderer.
+    """
+
+    options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON bytes."""
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+
+        ret = orjson.dumps(
+            data, default=encoders.JSONEncoder().default, option=self.options
+        )
+        # Escape the line and paragraph separators, which are valid in JSON
+        # but not in JavaScript strings.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class ORJSONParser(parsers.JSONParser):
+    """JSON parser using orjson, falling back to the stdlib parser."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming JSON bytestream."""
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace("-", "") != "utf8":
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
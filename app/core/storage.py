@@ -0,0 +1,176 @@
+"""
+File storages: content-addressed recipe images and precompressed static files.
+"""
+import hashlib
+import os
+import tempfile
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, get_storage_class
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+from core import compression
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files by the SHA-256 of their content.
+
+    Files are stored under the directory of the requested name, sharded by
+    the first two bytes of the hash, so identical uploads share one blob.
+    Saving content that is already stored skips the write. A blob is only
+    deleted once no recipe image references it. Saving and deleting a blob
+    take a database lock on its name, held until the end of the transaction,
+    so a blob reused by an upload in progress is not deleted before the
+    upload's recipe row is committed.
+    """
+
+    def _save(self, name, content):
+        """Store `content` under its hash, unless it is already stored."""
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        # Uploads already on disk are hashed in place and moved if new,
+        # anything else is hashed while it is copied to a temporary file.
+        in_place = hasattr(content, "temporary_file_path")
+        if in_place:
+            source = content.temporary_file_path()
+            digest = self._hash(content)
+        else:
+            fd, source = tempfile.mkstemp(dir=self.path(directory), suffix=".upload")
+            with os.fdopen(fd, "wb") as output:
+                digest = self._hash(content, output)
+
+        name = os.path.join(
+            directory, digest[:2], digest[2:4], f"{digest}{extension}"
+        ).replace("\\", "/")
+        path = self.path(name)
+        try:
+            self._lock(name)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                file_move_safe(source, path, allow_overwrite=True)
+                os.chmod(path, self.file_permissions_mode or 0o644)
+        finally:
+            if not in_place and os.path.exists(source):
+                os.remove(source)
+        return name
+
+    def _hash(self, content, output=None):
+        """Return the SHA-256 of `content`, copying it to `output` if given."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+            if output is not None:
+                output.write(chunk)
+        return digest.hexdigest()
+
+    def _lock(self, name):
+        """Lock the blob `name` until the end of the current transaction."""
+        key = int(hashlib.sha256(name.encode("utf-8")).hexdigest()[:15], 16)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+
+    def is_referenced(self, name):
+        """Return whether a recipe image uses the blob `name`."""
+        Recipe = apps.get_model("core", "Recipe")
+        return Recipe.objects.filter(image=name).exists()
+
+    def delete(self, name):
+        """Delete the blob `name` if no recipe image references it."""
+        if not name:
+            return
+        with transaction.atomic():
+            self._lock(name)
+            if not self.is_referenced(name):
+                super().delete(name)
+
+
+def recipe_image_storage():
+    """Return the storage for recipe images selected in the settings.
+
+    The default storage class is instantiated rather than returning
+    `default_storage`, so the field deconstructs the same way whatever the
+    setting and migrations stay stable.
+    """
+    if settings.RECIPE_IMAGE_CONTENT_ADDRESSED:
+        return ContentAddressedStorage()
+    return get_storage_class()()
+
+
+def _remember_image(sender, instance, **kwargs):
+    """Keep the image name a recipe was loaded with, unless it is deferred."""
+    if "image" not in instance.get_deferred_fields():
+        instance._stored_image = instance.image.name
+
+
+def _release_replaced_image(sender, instance, **kwargs):
+    """Release the previous image blob of a saved recipe once committed."""
+    previous = getattr(instance, "_stored_image", None)
+    if previous and previous != instance.image.name:
+        transaction.on_commit(partial(instance.image.storage.delete, previous))
+    instance._stored_image = instance.image.name
+
+
+def _release_deleted_image(sender, instance, **kwargs):
+    """Release the image blob of a deleted recipe once committed."""
+    if instance.image.name:
+        transaction.on_commit(
+            partial(instance.image.storage.delete, instance.image.name)
+        )
+
+
+def connect_reference_counting():
+    """Delete image blobs when their last recipe drops them."""
+    post_init.connect(_remember_image, sender="core.Recipe")
+    post_save.connect(_release_replaced_image, sender="core.Recipe")
+    post_delete.connect(_release_deleted_image, sender="core.Recipe")
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest static files storage also writing compressed copies.
+
+    After collectstatic, fingerprinted text files of at least
+    `COMPRESSION_MIN_SIZE` bytes have a `.gz` sibling at the highest level,
+    for nginx to serve as it is with `gzip_static`. No brotli copies are
+    written, as the stock nginx image has no `brotli_static`.
+    """
+
+    compress_extensions = (".css", ".js", ".map", ".svg", ".json", ".txt", ".html")
+    encoding_extensions = {"gzip": ".gz"}
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Fingerprint the collected files, then compress the results."""
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name:
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if not dry_run:
+            for hashed_name in sorted(hashed_names):
+                self._write_compressed(hashed_name)
+
+    def _write_compressed(self, name):
+        """Store the compressed copies of the file `name`, if worth it."""
+        if not name.lower().endswith(self.compress_extensions):
+            return
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < settings.COMPRESSION_MIN_SIZE:
+            return
+        for encoding in self.encoding_extensions:
+            compressed = compression.compress(content, encoding, static=True)
+            if len(compressed) >= len(content):
+                continue
+            compressed_name = f"{name}{self.encoding_extensions[encoding]}"
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(compressed))
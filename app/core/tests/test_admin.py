@@ -5,6 +5,8 @@ Tests for the Django admin modifications.
 from django.urls import reverse
 import pytest
 
+from conftest import create_recipe
+
 
 @pytest.mark.django_db
 def test_users_list(client, default_user):
@@ -28,3 +30,16 @@ def test_create_user_page(client, with_admin_user, default_user):
     url = reverse("admin:core_user_add")
     res = client.get(url)
     assert res.status_code == 200
+
+
+@pytest.mark.django_db
+def test_edit_recipe_page_lists_tags(client, with_admin_user, default_user):
+    """Test the edit recipe page shows the recipe tags inline."""
+    recipe = create_recipe(user=default_user)
+    recipe.tags.create(user=default_user, name="Vegan")
+    url = reverse("admin:core_recipe_change", args=[recipe.id])
+
+    res = client.get(url)
+
+    assert res.status_code == 200
+    assert b"recipetag_set" in res.content
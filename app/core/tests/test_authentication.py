@@ -0,0 +1,107 @@
+"""
+Tests for the cached token authentication.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from conftest import create_user, query_budget
+from core.checks import check_shared_auth_cache
+
+TAGS_URL = reverse("recipe:tag-list")
+ME_URL = reverse("user:me")
+
+
+@pytest.fixture
+def token_client(api_client):
+    """Return an API client authenticated with a real token."""
+    user = create_user(email="test@example.com", password="test123", name="Test")
+    token = Token.objects.create(user=user)
+    api_client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    api_client.user = user
+    api_client.token = token
+    return api_client
+
+
+@pytest.mark.django_db
+def test_token_lookup_cached(token_client):
+    """Test the token is only looked up on the first request."""
+    token_client.get(ME_URL)
+
+    with query_budget(0):
+        res = token_client.get(ME_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.data["email"] == token_client.user.email
+
+
+@pytest.mark.django_db
+def test_invalid_token_rejected(api_client):
+    """Test an unknown token is rejected."""
+    api_client.credentials(HTTP_AUTHORIZATION="Token invalid")
+
+    res = api_client.get(TAGS_URL)
+
+    assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_deleted_token_rejected(token_client):
+    """Test a deleted token is rejected right away."""
+    token_client.get(ME_URL)
+
+    token_client.token.delete()
+    res = token_client.get(ME_URL)
+
+    assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_deactivated_user_rejected(token_client):
+    """Test a deactivated user is rejected right away."""
+    token_client.get(ME_URL)
+
+    token_client.user.is_active = False
+    token_client.user.save()
+    res = token_client.get(ME_URL)
+
+    assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_user_queryset_update_rejected(token_client):
+    """Test users deactivated with a queryset update are rejected right away."""
+    token_client.get(ME_URL)
+
+    get_user_model().objects.filter(pk=token_client.user.pk).update(is_active=False)
+    res = token_client.get(ME_URL)
+
+    assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_local_auth_cache_warning(settings):
+    """Test deployments are warned about a per-process auth cache."""
+    settings.CACHES = {
+        **settings.CACHES,
+        "auth": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    assert [error.id for error in check_shared_auth_cache(None)] == ["core.W001"]
+
+    settings.CACHES = {
+        **settings.CACHES,
+        "auth": {"BACKEND": "django.core.cache.backends.redis.RedisCache"},
+    }
+    assert check_shared_auth_cache(None) == []
+
+
+@pytest.mark.django_db
+def test_user_update_refreshes_cache(token_client):
+    """Test edits through the user API are seen by the next request."""
+    token_client.get(ME_URL)
+
+    token_client.patch(ME_URL, {"name": "New name"})
+    res = token_client.get(ME_URL)
+
+    assert res.data["name"] == "New name"
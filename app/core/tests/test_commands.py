@@ -1,11 +1,19 @@
 """
 """
+from io import StringIO
+import json
+
 import pytest
 from psycopg2 import OperationalError as Psycopg2Error
 
 from django.core.management import call_command
+from django.db.backends.signals import connection_created
 from django.db.utils import OperationalError
 
+from conftest import create_user
+from core.management.commands.benchmark import BENCHMARK_EMAIL
+from core.models import Recipe, RecipeImport
+
 
 @pytest.fixture()
 def mocked_check_for_db(mocker):
@@ -32,3 +40,119 @@ def test_wait_for_db_delay(mocker, mocked_check_for_db):
     call_command("wait_for_db")
     assert mocked_check_for_db.call_count == 6
     mocked_check_for_db.assert_called_with(databases=["default"])
+
+
+@pytest.mark.django_db
+def test_import_recipes(tmp_path, default_user):
+    """Test importing recipes from a file, chunk by chunk."""
+    path = tmp_path / "recipes.csv"
+    rows = [f"Recipe {i},10,2.50,Dinner" for i in range(5)]
+    path.write_text("title,time_minutes,price,tags\n" + "\n".join(rows))
+    out = StringIO()
+
+    call_command(
+        "import_recipes", str(path), user=default_user.email, chunk_size=2, stdout=out
+    )
+
+    job = RecipeImport.objects.get(user=default_user)
+    assert job.finished
+    assert job.created == 5
+    assert Recipe.objects.filter(user=default_user).count() == 5
+    assert "4 rows processed" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_recipes_resume(tmp_path, default_user):
+    """Test resuming an import continues after the committed rows."""
+    path = tmp_path / "recipes.ndjson"
+    rows = [
+        json.dumps({"title": f"Recipe {i}", "time_minutes": 10, "price": "2.50"})
+        for i in range(4)
+    ]
+    path.write_text("\n".join(rows))
+    job = RecipeImport.objects.create(
+        user=default_user, source=str(path), rows_done=3, created=3
+    )
+
+    call_command(
+        "import_recipes", str(path), user=default_user.email, resume=job.id,
+        stdout=StringIO(),
+    )
+
+    recipe = Recipe.objects.get(user=default_user)
+    assert recipe.title == "Recipe 3"
+    job.refresh_from_db()
+    assert job.finished
+    assert job.created == 4
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("scenario", ["filters", "serializers", "json"])
+def test_benchmark(scenario):
+    """Test a benchmark scenario runs and removes its sample data."""
+    out = StringIO()
+
+    call_command(
+        "benchmark", scenario, recipes=20, attrs=5, links=2, repeat=1, stdout=out,
+    )
+
+    assert "Created 20 recipes" in out.getvalue()
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_concurrency():
+    """Test the concurrency benchmark serves requests from worker threads."""
+    out = StringIO()
+
+    call_command(
+        "benchmark",
+        "concurrency",
+        recipes=20,
+        attrs=5,
+        links=2,
+        repeat=1,
+        concurrency=4,
+        query_delay=1,
+        stdout=out,
+    )
+
+    assert "asgi async" in out.getvalue()
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+def test_benchmark_replaces_leftover_user():
+    """Test the benchmark runs again after an interrupted run."""
+    create_user(email=BENCHMARK_EMAIL, password="benchmark")
+
+    call_command(
+        "benchmark", "json", recipes=5, attrs=2, links=1, repeat=1, stdout=StringIO()
+    )
+
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_concurrency_failure_removes_delay(mocker):
+    """Test the query delay hook is removed when a scenario fails."""
+    mocker.patch(
+        "core.management.commands.benchmark.ASGIHandler", side_effect=RuntimeError
+    )
+    receivers = len(connection_created.receivers)
+
+    with pytest.raises(RuntimeError):
+        call_command(
+            "benchmark",
+            "concurrency",
+            recipes=5,
+            attrs=2,
+            links=1,
+            repeat=1,
+            concurrency=2,
+            query_delay=1,
+            stdout=StringIO(),
+        )
+
+    assert len(connection_created.receivers) == receivers
+    assert not Recipe.objects.exists()
@@ -0,0 +1,221 @@
+"""
+Tests for the database connection pool and the pooled backend.
+"""
+import threading
+from unittest import mock
+
+import psycopg2
+import pytest
+from django.db import connection
+from django.urls import reverse
+from psycopg2 import extensions
+from rest_framework import status
+
+from conftest import create_user
+from core.db import pool as db_pool
+
+POOL_STATS_URL = reverse("db-pool-stats")
+
+
+class FakeConnection:
+    """Stand-in for a psycopg2 connection."""
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+        self.info = mock.Mock(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+        self.queries = []
+        self.broken = False
+
+    def cursor(self):
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.execute.side_effect = self.execute
+        return cursor
+
+    def execute(self, sql):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.queries.append(sql)
+
+    def rollback(self):
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**options):
+    """Return a pool of fake connections."""
+    defaults = {"max_size": 2, "timeout": 1, "max_lifetime": 60, "check_after": 60}
+    return db_pool.ConnectionPool(FakeConnection, **{**defaults, **options})
+
+
+def test_pool_reuses_connections():
+    """Test returned connections are handed out again."""
+    pool = make_pool()
+
+    first = pool.getconn()
+    pool.putconn(first)
+    second = pool.getconn()
+
+    assert second is first
+    assert pool.stats()["opened"] == 1
+    assert pool.stats()["checkouts"] == 2
+    assert pool.stats()["in_use"] == 1
+
+
+def test_pool_waits_for_a_connection():
+    """Test a full pool waits for a connection to be returned."""
+    pool = make_pool(max_size=1)
+    first = pool.getconn()
+    timer = threading.Timer(0.05, pool.putconn, [first])
+    timer.start()
+
+    second = pool.getconn()
+
+    timer.join()
+    assert second is first
+    assert pool.stats()["waits"] == 1
+
+
+def test_pool_timeout():
+    """Test a full pool fails after the timeout."""
+    pool = make_pool(max_size=1, timeout=0.01)
+    pool.getconn()
+
+    with pytest.raises(db_pool.PoolTimeout):
+        pool.getconn()
+
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_pool_checks_idle_connections():
+    """Test connections idle past `check_after` are pinged, and replaced if dead."""
+    pool = make_pool(check_after=0)
+    first = pool.getconn()
+    pool.putconn(first)
+
+    assert pool.getconn() is first
+    assert first.queries == ["SELECT 1"]
+
+    pool.putconn(first)
+    first.broken = True
+    second = pool.getconn()
+
+    assert second is not first
+    assert first.closed
+    assert pool.stats()["failed_checks"] == 1
+
+
+def test_pool_recycles_old_connections():
+    """Test connections older than `max_lifetime` are closed on return."""
+    pool = make_pool(max_lifetime=0)
+    first = pool.getconn()
+
+    pool.putconn(first)
+
+    assert first.closed
+    assert pool.stats()["size"] == 0
+    assert pool.getconn() is not first
+
+
+def test_pool_rolls_back_returned_transactions():
+    """Test connections returned in a transaction are rolled back."""
+    pool = make_pool()
+    first = pool.getconn()
+    first.autocommit = False
+    first.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+
+    pool.putconn(first)
+
+    assert first.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+    assert first.autocommit
+    assert not first.closed
+
+
+def test_pool_checks_connections_on_request():
+    """Test returned connections are pinged when asked and dropped if broken."""
+    pool = make_pool()
+    first, second = pool.getconn(), pool.getconn()
+    second.broken = True
+
+    pool.putconn(first, check=True)
+    pool.putconn(second, check=True)
+
+    assert first.queries == ["SELECT 1"]
+    assert not first.closed
+    assert second.closed
+    assert pool.getconn() is first
+
+
+@pytest.mark.django_db(transaction=True)
+def test_backend_pool_not_bound_to_wrapper():
+    """Test the shared pool opens connections without the wrapper that made it."""
+    connection.ensure_connection()
+    connect = connection.pool.connect
+
+    assert connection not in connect.args
+    assert not any(isinstance(arg, type(connection)) for arg in connect.args)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_backend_checks_connection_after_errors():
+    """Test connections are pinged on return after a database error."""
+    connection.ensure_connection()
+    connection.errors_occurred = True
+
+    pool = connection.pool
+    with mock.patch.object(pool, "putconn", wraps=pool.putconn) as putconn:
+        connection.close()
+
+    putconn.assert_called_once()
+    assert putconn.call_args.kwargs == {"check": True}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_backend_keeps_connection_open():
+    """Test closing the Django connection returns it to the pool."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        backend_pid = cursor.fetchone()[0]
+    raw_connection = connection.connection
+
+    connection.close()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+
+        assert cursor.fetchone()[0] == backend_pid
+    assert connection.connection is raw_connection
+    assert isinstance(raw_connection, psycopg2.extensions.connection)
+
+
+@pytest.mark.django_db
+def test_pool_stats_staff_only(api_client):
+    """Test pool statistics are only shown to staff users."""
+    user = create_user(email="user@example.com", password="testpass123")
+    api_client.force_authenticate(user)
+
+    res = api_client.get(POOL_STATS_URL)
+
+    assert res.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_pool_stats(api_client):
+    """Test staff users see the pools of the process."""
+    user = create_user(email="admin@example.com", password="testpass123")
+    user.is_staff = True
+    user.save()
+    api_client.force_authenticate(user)
+
+    res = api_client.get(POOL_STATS_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    stats = next(
+        item
+        for item in res.data["pools"]
+        if item["database"] == connection.settings_dict["NAME"]
+    )
+    assert stats["alias"] == "default"
+    assert stats["in_use"] >= 1
+    assert {"waits", "checkout_ms_avg", "checkout_ms_max"} <= set(stats)
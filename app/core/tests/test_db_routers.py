@@ -0,0 +1,171 @@
+"""
+Tests for routing reads to read replicas.
+"""
+import runpy
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from app import settings as app_settings
+from conftest import create_recipe
+from core.db import routers
+from core.models import Recipe
+
+REPLICA = "replica1"
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+ME_URL = reverse("user:me")
+
+
+@pytest.fixture
+def replica(settings):
+    """Add a replica alias mirroring the test database."""
+    connections.settings[REPLICA] = {
+        **connections[DEFAULT_DB_ALIAS].settings_dict,
+        "TEST": {"MIRROR": DEFAULT_DB_ALIAS},
+    }
+    settings.DATABASE_REPLICAS = [REPLICA]
+    yield connections[REPLICA]
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.settings[REPLICA]
+    cache.clear()
+
+
+def test_router_reads_from_replica_when_allowed(replica):
+    """Test reads go to a replica only while allowed, writes to the primary."""
+    router = routers.ReplicaRouter()
+
+    assert router.db_for_read(Recipe) == DEFAULT_DB_ALIAS
+    token = routers.replica_alias.set(REPLICA)
+    try:
+        assert router.db_for_read(Recipe) == REPLICA
+        assert router.db_for_write(Recipe) == DEFAULT_DB_ALIAS
+    finally:
+        routers.replica_alias.reset(token)
+    assert router.allow_migrate(DEFAULT_DB_ALIAS, "core")
+    assert not router.allow_migrate(REPLICA, "core")
+
+
+def test_router_without_replicas():
+    """Test everything goes to the primary when no replica is configured."""
+    token = routers.replica_alias.set(REPLICA)
+    try:
+        assert routers.ReplicaRouter().db_for_read(Recipe) == DEFAULT_DB_ALIAS
+    finally:
+        routers.replica_alias.reset(token)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_safe_requests_read_from_replica(api_client, authenticated_user, replica):
+    """Test lists read from the replica, apart from the data version."""
+    create_recipe(user=authenticated_user)
+
+    with CaptureQueriesContext(replica) as replica_queries:
+        res = api_client.get(RECIPES_URL)
+        tags_res = api_client.get(TAGS_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert tags_res.status_code == status.HTTP_200_OK
+    assert len(res.data) == 1
+    assert replica_queries
+    assert not any("data_version" in q["sql"] for q in replica_queries)
+    assert routers.replica_alias.get() is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replica_responses_not_cached(api_client, authenticated_user, replica):
+    """Test responses read from a replica are neither cached nor tagged."""
+    create_recipe(user=authenticated_user)
+
+    res = api_client.get(RECIPES_URL)
+    with CaptureQueriesContext(replica) as replica_queries:
+        api_client.get(RECIPES_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert "ETag" not in res
+    assert res["Cache-Control"] == "private, no-cache"
+    assert any("core_recipe" in q["sql"] for q in replica_queries)
+
+    routers.pin_to_primary(authenticated_user)
+    res = api_client.get(RECIPES_URL)
+    cache.delete(routers._pin_key(authenticated_user))
+    cached_res = api_client.get(RECIPES_URL)
+
+    assert res["ETag"] == cached_res["ETag"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_request_reads_from_one_replica(api_client, authenticated_user, replica):
+    """Test all reads of a request go to the replica chosen for it."""
+    create_recipe(user=authenticated_user)
+
+    with mock.patch.object(
+        routers, "choose_replica", wraps=routers.choose_replica
+    ) as choose_replica:
+        with CaptureQueriesContext(replica) as replica_queries:
+            res = api_client.get(RECIPES_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert len(replica_queries) > 1
+    choose_replica.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_no_pin_lookup_without_replicas(api_client, authenticated_user):
+    """Test safe requests skip the pin lookup when no replica is configured."""
+    with mock.patch.object(routers, "is_pinned") as is_pinned:
+        res = api_client.get(RECIPES_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    is_pinned.assert_not_called()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_after_write_use_primary(api_client, authenticated_user, replica):
+    """Test reads following a write are pinned to the primary for a while."""
+    payload = {"title": "Sample recipe", "time_minutes": 5, "price": "5.50"}
+    res = api_client.post(RECIPES_URL, payload)
+    assert res.status_code == status.HTTP_201_CREATED
+
+    with CaptureQueriesContext(replica) as replica_queries:
+        res = api_client.get(RECIPES_URL)
+        me_res = api_client.get(ME_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert me_res.status_code == status.HTTP_200_OK
+    assert res.data[0]["title"] == payload["title"]
+    assert not replica_queries
+
+    cache.delete(routers._pin_key(authenticated_user))
+    with CaptureQueriesContext(replica) as replica_queries:
+        api_client.get(f"{RECIPES_URL}?fields=title")
+
+    assert replica_queries
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_write_does_not_pin(api_client, authenticated_user, replica):
+    """Test rejected writes leave reads on the replica."""
+    res = api_client.post(RECIPES_URL, {"title": ""})
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    assert not routers.is_pinned(authenticated_user)
+
+
+def test_replicas_require_shared_cache(monkeypatch):
+    """Test settings with replicas refuse a process local cache."""
+    monkeypatch.setenv("DB_REPLICA_HOSTS", "replica-db")
+    monkeypatch.delenv("CACHE_BACKEND", raising=False)
+
+    with pytest.raises(ImproperlyConfigured):
+        runpy.run_path(app_settings.__file__)
+
+    monkeypatch.setenv("CACHE_BACKEND", "django.core.cache.backends.redis.RedisCache")
+    assert runpy.run_path(app_settings.__file__)["DATABASE_REPLICAS"] == ["replica1"]
@@ -13,3 +13,11 @@ def test_health_check(api_client):
     res = api_client.get(url)
 
     assert res.status_code == status.HTTP_200_OK
+
+
+def test_health_check_async(api_client):
+    """Test the async health check API."""
+    res = api_client.get(reverse("async-health-check"))
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.json() == {"healthy": True}
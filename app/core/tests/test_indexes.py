@@ -0,0 +1,91 @@
+"""
+Tests for the indexes backing the recipe API queries.
+"""
+import pytest
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from conftest import create_recipe
+from core.models import Ingredient, Recipe, Tag
+from recipe.views import RecipeViewSet, TagViewSet
+
+
+def explain(queryset):
+    """Return the plan of a queryset with sequential scans disabled.
+
+    The test tables are tiny, so the planner would otherwise scan them
+    sequentially whatever indexes exist.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    return queryset.explain()
+
+
+def list_queryset(viewset, user, params=None):
+    """Return the list queryset of a viewset for a request with `params`."""
+    request = Request(APIRequestFactory().get("/", params or {}))
+    request.user = user
+    view = viewset(request=request, action="list", format_kwarg=None)
+    return view.get_queryset().prefetch_related(None)
+
+
+@pytest.fixture
+def linked_recipes(default_user):
+    """Create recipes linked to a tag and an ingredient."""
+    tag = Tag.objects.create(user=default_user, name="Vegan")
+    ingredient = Ingredient.objects.create(user=default_user, name="Salt")
+    for _ in range(3):
+        recipe = create_recipe(user=default_user)
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+    return tag, ingredient
+
+
+@pytest.mark.django_db
+def test_recipe_list_uses_user_id_index(default_user):
+    """Test listing recipes scans the (user, -id) index."""
+    plan = explain(list_queryset(RecipeViewSet, default_user))
+
+    assert "recipe_user_id_desc_idx" in plan
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("match", ["any", "all"])
+def test_recipe_tag_filter_uses_reverse_index(default_user, linked_recipes, match):
+    """Test filtering by tags looks links up by tag first."""
+    tag, ingredient = linked_recipes
+    params = {"tags": str(tag.id), "match": match}
+
+    plan = explain(list_queryset(RecipeViewSet, default_user, params))
+
+    assert "recipe_tags_tag_recipe_idx" in plan
+
+
+@pytest.mark.django_db
+def test_recipe_ingredient_filter_uses_reverse_index(default_user, linked_recipes):
+    """Test filtering by ingredients looks links up by ingredient first."""
+    tag, ingredient = linked_recipes
+    params = {"ingredients": str(ingredient.id)}
+
+    plan = explain(list_queryset(RecipeViewSet, default_user, params))
+
+    assert "recipe_ingr_ingr_recipe_idx" in plan
+
+
+@pytest.mark.django_db
+def test_tag_list_uses_user_name_index(default_user, linked_recipes):
+    """Test listing tags scans the (user, name) unique index."""
+    plan = explain(list_queryset(TagViewSet, default_user))
+
+    assert "unique_tag_name_per_user" in plan
+
+
+@pytest.mark.django_db
+def test_image_reference_lookup_uses_image_index(default_user):
+    """Test checking whether a blob is referenced scans the image index."""
+    create_recipe(user=default_user, image="recipe/ab/abcdef.jpg")
+
+    plan = explain(Recipe.objects.filter(image="recipe/ab/abcdef.jpg")[:1])
+
+    assert "recipe_image_idx" in plan
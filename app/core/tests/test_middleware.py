@@ -0,0 +1,144 @@
+"""
+Tests for the response compression middleware.
+"""
+import gzip
+import zlib
+
+import pytest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework import status
+
+from conftest import create_recipe
+from core import compression
+from core.middleware import CompressionMiddleware
+
+RECIPES_URL = reverse("recipe:recipe-list")
+PAYLOAD = b'{"title": "Sample recipe title"}' * 100
+
+
+def respond(response, accept_encoding="gzip, deflate, br"):
+    """Run a response through the middleware and return it."""
+    request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+@pytest.fixture
+def without_brotli(mocker):
+    """Make compression run as if brotli was not installed."""
+    mocker.patch("core.compression.brotli", None)
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("*;q=0.1, br;q=0", "gzip"),
+        ("GZIP;q=bad", None),
+    ],
+)
+def test_select_encoding(header, expected):
+    """Test the best accepted encoding is picked."""
+    pytest.importorskip("brotli")
+
+    assert compression.select_encoding(header) == expected
+
+
+def test_select_encoding_without_brotli(without_brotli):
+    """Test gzip is used when brotli is not installed."""
+    assert compression.select_encoding("br, gzip") == "gzip"
+
+
+def test_compress_gzip(without_brotli):
+    """Test allowed responses are gzipped with a weak ETag."""
+    response = HttpResponse(PAYLOAD, content_type="application/json")
+    response["ETag"] = '"abc"'
+
+    response = respond(response)
+
+    assert response["Content-Encoding"] == "gzip"
+    assert response["Vary"] == "Accept-Encoding"
+    assert response["ETag"] == 'W/"abc"'
+    assert int(response["Content-Length"]) == len(response.content)
+    assert gzip.decompress(response.content) == PAYLOAD
+
+
+def test_compress_brotli():
+    """Test brotli is preferred when the client accepts it."""
+    brotli = pytest.importorskip("brotli")
+
+    response = respond(HttpResponse(PAYLOAD, content_type="application/json"))
+
+    assert response["Content-Encoding"] == "br"
+    assert brotli.decompress(response.content) == PAYLOAD
+
+
+@pytest.mark.parametrize(
+    "response,accept_encoding",
+    [
+        (HttpResponse(PAYLOAD[:100], content_type="application/json"), "gzip"),
+        (HttpResponse(PAYLOAD, content_type="text/html"), "gzip"),
+        (HttpResponse(PAYLOAD, content_type="image/jpeg"), "gzip"),
+        (HttpResponse(PAYLOAD, content_type="application/json"), "identity"),
+    ],
+)
+def test_not_compressed(response, accept_encoding):
+    """Test small, not allowed or not negotiated responses are sent as is."""
+    response = respond(response, accept_encoding)
+
+    assert not response.has_header("Content-Encoding")
+    assert response.content in (PAYLOAD, PAYLOAD[:100])
+
+
+def test_compress_streaming(without_brotli, mocker):
+    """Test streaming responses are flushed once enough input is buffered."""
+    mocker.patch("core.compression.STREAM_FLUSH_BYTES", 20)
+    chunks = [b'{"id": %d}\n' % i for i in range(4)]
+    response = StreamingHttpResponse(iter(chunks), content_type="application/x-ndjson")
+
+    response = respond(response)
+    compressed = list(response.streaming_content)
+
+    assert response["Content-Encoding"] == "gzip"
+    assert len(compressed) == 3
+    decompressor = zlib.decompressobj(31)
+    assert decompressor.decompress(compressed[0]) == b"".join(chunks[:2])
+    assert gzip.decompress(b"".join(compressed)) == b"".join(chunks)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_compress_stream_small_chunks(encoding):
+    """Test many small chunks compress about as well as one buffer."""
+    if encoding == "br":
+        pytest.importorskip("brotli")
+    chunks = [b'{"id": %d, "title": "Sample recipe"}\n' % i for i in range(5000)]
+
+    streamed = b"".join(compression.compress_stream(iter(chunks), encoding))
+
+    whole = compression.compress(b"".join(chunks), encoding)
+    assert len(streamed) < len(whole) * 1.2
+
+
+@pytest.mark.django_db
+def test_api_response_compressed(api_client, authenticated_user, without_brotli):
+    """Test recipe lists are compressed and revalidate with the weak ETag."""
+    for _ in range(10):
+        create_recipe(user=authenticated_user)
+
+    res = api_client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip")
+    cached = api_client.get(
+        RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=res["ETag"]
+    )
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["Content-Encoding"] == "gzip"
+    assert res["ETag"].startswith('W/"')
+    assert len(gzip.decompress(res.content)) > len(res.content)
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
@@ -3,6 +3,7 @@ Test for models.
 """
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 import pytest
 
 from core import models
@@ -86,6 +87,47 @@ def test_create_ingredient():
     assert str(ingredient) == ingredient.name
 
 
+@pytest.mark.django_db
+def test_tag_name_unique_per_user():
+    """Test a user cannot have two tags with the same name."""
+    user = create_user(email="user@example.com", password="pass123")
+    other_user = create_user(email="other@example.com", password="pass123")
+    models.Tag.objects.create(user=user, name="Vegan")
+    models.Tag.objects.create(user=other_user, name="Vegan")
+
+    with pytest.raises(IntegrityError):
+        models.Tag.objects.create(user=user, name="Vegan")
+
+
+@pytest.mark.django_db
+def test_user_save_keeps_data_version():
+    """Test saving a stale user instance does not move its data version back."""
+    user = create_user(email="user@example.com", password="pass123")
+    get_user_model().objects.filter(pk=user.pk).update(data_version=3)
+
+    user.name = "Renamed"
+    user.save()
+
+    user.refresh_from_db()
+    assert user.name == "Renamed"
+    assert user.data_version == 3
+
+
+@pytest.mark.django_db
+def test_get_or_create_many():
+    """Test resolving names returns existing objects and creates missing ones."""
+    user = create_user(email="user@example.com", password="pass123")
+    existing = models.Ingredient.objects.create(user=user, name="Salt")
+
+    ingredients = models.Ingredient.objects.get_or_create_many(
+        user, ["Salt", "Pepper", "Pepper"]
+    )
+
+    assert set(ingredients) == {"Salt", "Pepper"}
+    assert ingredients["Salt"] == existing
+    assert models.Ingredient.objects.filter(user=user).count() == 2
+
+
 def test_recipe_file_name_uuid(mocker):
     """Test generating image path."""
     uuid = "test-uuid"
@@ -0,0 +1,100 @@
+"""
+Tests for the JSON renderer and parser.
+"""
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import ORJSONParser, ORJSONRenderer
+
+PAYLOAD = [
+    OrderedDict(
+        [
+            ("id", 1),
+            ("title", gettext_lazy("Thai curry")),
+            ("price", Decimal("12.50")),
+            ("rank", 0.0607927),
+            ("image", "http://testserver/static/media/uploads/recipe/a.jpg"),
+            ("created", datetime(2022, 6, 9, 18, 54, 1, 123456, tzinfo=timezone.utc)),
+            ("day", date(2022, 6, 9)),
+            ("description", "Line\u2028paragraph\u2029 and café"),
+            ("tags", [{"id": 2, "name": "Vegan"}]),
+            ("counts", {1: "one"}),
+            ("link", None),
+            ("public", True),
+        ]
+    )
+]
+
+
+@pytest.fixture
+def without_orjson(mocker):
+    """Make the renderer and parser run as if orjson was not installed."""
+    mocker.patch("core.renderers.orjson", None)
+
+
+def test_render_same_as_drf():
+    """Test rendering gives the same bytes as DRF's JSON renderer."""
+    assert ORJSONRenderer().render(PAYLOAD) == JSONRenderer().render(PAYLOAD)
+
+
+def test_render_escapes_line_separators():
+    """Test U+2028 and U+2029 are escaped in the output."""
+    ret = ORJSONRenderer().render({"text": "a\u2028b\u2029c"})
+
+    assert ret == b'{"text":"a\\u2028b\\u2029c"}'
+
+
+def test_render_none():
+    """Test rendering no data gives an empty body."""
+    assert ORJSONRenderer().render(None) == b""
+
+
+def test_render_indented_same_as_drf():
+    """Test indented rendering gives the same bytes as DRF."""
+    media_type = "application/json; indent=4"
+
+    assert ORJSONRenderer().render(PAYLOAD, media_type) == JSONRenderer().render(
+        PAYLOAD, media_type
+    )
+
+
+def test_render_without_orjson(without_orjson):
+    """Test rendering falls back to the stdlib renderer."""
+    assert ORJSONRenderer().render(PAYLOAD) == JSONRenderer().render(PAYLOAD)
+
+
+@pytest.mark.parametrize("fallback", [False, True])
+def test_parse_same_as_drf(mocker, fallback):
+    """Test parsing gives the same data as DRF's JSON parser."""
+    if fallback:
+        mocker.patch("core.renderers.orjson", None)
+    body = JSONRenderer().render(PAYLOAD)
+
+    data = ORJSONParser().parse(BytesIO(body))
+
+    assert data == JSONParser().parse(BytesIO(body))
+    assert data[0]["description"] == "Line\u2028paragraph\u2029 and café"
+
+
+@pytest.mark.parametrize("body", [b"{", b'{"price": NaN}', b"\xff"])
+def test_parse_invalid(body):
+    """Test invalid JSON raises a parse error."""
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(BytesIO(body))
+
+
+def test_parse_other_encoding():
+    """Test bodies in other declared encodings are decoded first."""
+    body = '{"name": "café"}'.encode("latin-1")
+
+    data = ORJSONParser().parse(BytesIO(body), parser_context={"encoding": "latin-1"})
+
+    assert data == {"name": "café"}
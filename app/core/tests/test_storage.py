@@ -0,0 +1,165 @@
+"""
+Tests for the recipe image and static files storages.
+"""
+import gzip
+import hashlib
+import os
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+from conftest import create_recipe, query_budget
+from core import storage as core_storage
+from core.models import Recipe
+
+CONTENT = b"sample image content"
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+BLOB_NAME = f"uploads/recipe/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.jpg"
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Return a content-addressed storage in a temporary directory."""
+    return core_storage.ContentAddressedStorage(location=str(tmp_path))
+
+
+@pytest.fixture
+def recipe_image_storage(storage, mocker):
+    """Store recipe images in the content-addressed storage."""
+    mocker.patch.object(Recipe._meta.get_field("image"), "storage", storage)
+    core_storage.connect_reference_counting()
+    yield storage
+    post_init.disconnect(core_storage._remember_image, sender="core.Recipe")
+    post_save.disconnect(core_storage._release_replaced_image, sender="core.Recipe")
+    post_delete.disconnect(core_storage._release_deleted_image, sender="core.Recipe")
+
+
+def stored_files(storage):
+    """Return the paths of all files in a storage, relative to its root."""
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, filename), storage.location)
+        for dirpath, dirnames, filenames in os.walk(storage.location)
+        for filename in filenames
+    )
+
+
+@pytest.mark.django_db
+def test_save_names_file_by_content(storage):
+    """Test saved files are named by their hash in sharded directories."""
+    name = storage.save("uploads/recipe/photo.JPG", ContentFile(CONTENT))
+
+    assert name == BLOB_NAME
+    with storage.open(name) as stored:
+        assert stored.read() == CONTENT
+
+
+@pytest.mark.django_db
+def test_save_duplicate_content_once(storage):
+    """Test identical uploads share a single stored file."""
+    first = storage.save("uploads/recipe/a.jpg", ContentFile(CONTENT))
+    second = storage.save("uploads/recipe/b.jpg", ContentFile(CONTENT))
+    other = storage.save("uploads/recipe/c.jpg", ContentFile(b"other content"))
+
+    assert first == second
+    assert other != first
+    assert stored_files(storage) == sorted([first, other])
+
+
+@pytest.mark.django_db
+def test_save_temporary_upload_moves_file(storage):
+    """Test uploads spooled to disk are moved, or left alone if stored."""
+    uploads = []
+    for _ in range(2):
+        upload = TemporaryUploadedFile("photo.jpg", "image/jpeg", len(CONTENT), None)
+        upload.write(CONTENT)
+        upload.flush()
+        uploads.append(upload)
+
+    names = [storage.save("uploads/recipe/photo.jpg", upload) for upload in uploads]
+
+    assert names == [BLOB_NAME, BLOB_NAME]
+    assert not os.path.exists(uploads[0].temporary_file_path())
+    assert os.path.exists(uploads[1].temporary_file_path())
+    assert stored_files(storage) == [BLOB_NAME]
+    for upload in uploads:
+        upload.close()
+
+
+@pytest.mark.django_db
+def test_shared_blob_deleted_with_last_reference(
+    recipe_image_storage, recipe, django_capture_on_commit_callbacks
+):
+    """Test a blob used by several recipes is kept until the last is deleted."""
+    other = create_recipe(user=recipe.user)
+    for item in (recipe, other):
+        item.image.save("photo.jpg", ContentFile(CONTENT))
+    assert recipe.image.name == other.image.name == BLOB_NAME
+
+    with django_capture_on_commit_callbacks(execute=True):
+        other.delete()
+
+    assert recipe_image_storage.exists(BLOB_NAME)
+    with django_capture_on_commit_callbacks(execute=True):
+        Recipe.objects.get(pk=recipe.pk).delete()
+    assert not recipe_image_storage.exists(BLOB_NAME)
+
+
+@pytest.mark.django_db
+def test_replaced_image_released(
+    recipe_image_storage, recipe, django_capture_on_commit_callbacks
+):
+    """Test replacing an image deletes the old blob once unreferenced."""
+    recipe.image.save("photo.jpg", ContentFile(CONTENT))
+    recipe = Recipe.objects.get(pk=recipe.pk)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.image.save("photo.jpg", ContentFile(b"new content"))
+
+    assert not recipe_image_storage.exists(BLOB_NAME)
+    assert recipe_image_storage.exists(recipe.image.name)
+
+
+@pytest.mark.django_db
+def test_image_kept_when_delete_rolled_back(recipe_image_storage, recipe):
+    """Test a blob is only released once the delete is committed."""
+    recipe.image.save("photo.jpg", ContentFile(CONTENT))
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            Recipe.objects.get(pk=recipe.pk).delete()
+            raise RuntimeError
+
+    assert recipe_image_storage.exists(BLOB_NAME)
+    assert Recipe.objects.filter(image=BLOB_NAME).exists()
+
+
+@pytest.mark.django_db
+def test_deferred_image_not_loaded(recipe_image_storage, recipe):
+    """Test recipes loaded without their image column need no extra query."""
+    recipe.image.save("photo.jpg", ContentFile(CONTENT))
+
+    with query_budget(1):
+        recipes = list(Recipe.objects.only("id", "title"))
+
+    assert [item.id for item in recipes] == [recipe.id]
+
+
+def test_static_files_precompressed(tmp_path, settings):
+    """Test collected static files get fingerprinted compressed copies."""
+    settings.STATIC_ROOT = str(tmp_path)
+    static_storage = core_storage.CompressedManifestStaticFilesStorage()
+    css = b"body { color: #333; }\n" * 100
+    static_storage.save("app.css", ContentFile(css))
+    static_storage.save("logo.png", ContentFile(b"\x89PNG" * 1000))
+
+    paths = {name: (static_storage, name) for name in ("app.css", "logo.png")}
+    list(static_storage.post_process(paths))
+
+    hashed_name = static_storage.stored_name("app.css")
+    with static_storage.open(f"{hashed_name}.gz") as compressed:
+        assert gzip.decompress(compressed.read()) == css
+    assert not static_storage.exists(f"{static_storage.stored_name('logo.png')}.gz")
+    assert not static_storage.exists(f"{hashed_name}.br")
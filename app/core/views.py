@@ -1,11 +1,42 @@
 """
 Core views for app.
 """
-from rest_framework.decorators import api_view
+import os
+
+from django.http import JsonResponse
+from drf_spectacular.utils import OpenApiTypes, extend_schema
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+)
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
+from core.authentication import CachedTokenAuthentication
+from core.db.pool import all_pools
+
 
 @api_view(["GET"])
 def health_check(request):
     """Returns successful response."""
     return Response({"healthy": True})
+
+
+async def health_check_async(request):
+    """Returns successful response from the event loop, without a thread."""
+    return JsonResponse({"healthy": True})
+
+
+@extend_schema(responses=OpenApiTypes.OBJECT)
+@api_view(["GET"])
+@authentication_classes([CachedTokenAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def db_pool_stats(request):
+    """Returns the database connection pool statistics of this process."""
+    pools = [
+        {"alias": alias, "database": dict(params).get("database"), **pool.stats()}
+        for (alias, params), pool in all_pools().items()
+    ]
+    return Response({"pid": os.getpid(), "pools": pools})
@@ -0,0 +1,15 @@
+"""
+Async views for the recipe API, for the ASGI application.
+
+Django 4.0 has no async ORM and DRF views are synchronous, so these views
+run the recipe viewset actions in the worker pool of `core.offload`. Plain
+sync views get a thread and a database connection per request under ASGI;
+the pool bounds both, so bursts queue for a worker instead of exhausting
+the database connection pool.
+"""
+from core.offload import offloaded
+from recipe.views import RecipeViewSet
+
+recipe_list = offloaded(RecipeViewSet.as_view({"get": "list"}))
+recipe_detail = offloaded(RecipeViewSet.as_view({"get": "retrieve"}))
+recipe_upload_image = offloaded(RecipeViewSet.as_view({"post": "upload_image"}))
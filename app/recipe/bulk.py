@@ -0,0 +1,158 @@
+"""
+Bulk operations for recipes.
+"""
+from itertools import islice
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.search import update_search_vectors
+
+# Recipe attribute to its M2M through model and field name.
+RECIPE_ATTR_LINKS = {
+    "tags": (Recipe.tags.through, "tag"),
+    "ingredients": (Recipe.ingredients.through, "ingredient"),
+}
+
+
+def validate_recipes(items, serializer):
+    """Validate each item with `serializer`.
+
+    Return a list of validated data, with a `ValidationError` in place of
+    each item that failed validation. Items that already are a
+    `ValidationError` are passed through.
+    """
+    results = []
+    for item in items:
+        if isinstance(item, ValidationError):
+            results.append(item)
+            continue
+        try:
+            results.append(serializer.run_validation(item))
+        except ValidationError as exc:
+            results.append(exc)
+    return results
+
+
+def item_errors(validated, first_row=1):
+    """Return `(row number, errors)` for the items that failed validation.
+
+    Rows are numbered from 1, counting from `first_row`, in the batch and
+    import responses alike. Errors are always a field to messages mapping,
+    errors about the item as a whole being under the non field errors key.
+    """
+    return [
+        (row, _error_dict(item.detail))
+        for row, item in enumerate(validated, start=first_row)
+        if isinstance(item, ValidationError)
+    ]
+
+
+def _error_dict(detail):
+    """Return validation error `detail` as a mapping of field to messages."""
+    if isinstance(detail, dict):
+        return detail
+    if not isinstance(detail, list):
+        detail = [detail]
+    return {api_settings.NON_FIELD_ERRORS_KEY: detail}
+
+
+def create_recipes(user, items):
+    """Create recipes from validated data with a constant number of queries.
+
+    Tags and ingredients for the whole batch are resolved at once, then
+    recipes and their M2M links are inserted with bulk statements in a
+    single transaction. Return the created recipes in input order.
+    """
+    items = [dict(item) for item in items]
+    tag_names = [[tag["name"] for tag in item.pop("tags", [])] for item in items]
+    ingredient_names = [
+        [ingredient["name"] for ingredient in item.pop("ingredients", [])]
+        for item in items
+    ]
+    for item in items:
+        item.pop("image", None)
+
+    with transaction.atomic():
+        tags = Tag.objects.get_or_create_many(user, _flatten(tag_names))
+        ingredients = Ingredient.objects.get_or_create_many(
+            user, _flatten(ingredient_names)
+        )
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(user=user, **item) for item in items]
+        )
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe, names in zip(recipes, tag_names)
+                for tag_id in {tags[name].id for name in names}
+            ]
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            [
+                Recipe.ingredients.through(
+                    recipe_id=recipe.id, ingredient_id=ingredient_id
+                )
+                for recipe, names in zip(recipes, ingredient_names)
+                for ingredient_id in {ingredients[name].id for name in names}
+            ]
+        )
+        update_search_vectors(
+            Recipe.objects.filter(pk__in=[recipe.id for recipe in recipes])
+        )
+    return recipes
+
+
+def iter_recipe_rows(queryset, fields, chunk_size=1000):
+    """Yield recipes from `queryset` as dicts with their tags and ingredients.
+
+    Rows are read through a server-side cursor and tags and ingredients are
+    loaded for each chunk of `chunk_size` recipes, so memory use does not
+    grow with the number of recipes.
+    """
+    rows = (
+        queryset.prefetch_related(None).values(*fields).iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from add_recipe_attrs(chunk)
+
+
+def add_recipe_attrs(rows, attrs=("tags", "ingredients")):
+    """Attach the tags and/or ingredients of recipe rows, one query each.
+
+    Tags and ingredients are ordered by id, like the recipe queryset
+    prefetches them. Returns the rows.
+    """
+    recipe_ids = [row["id"] for row in rows]
+    maps = {
+        attr: attr_map(*RECIPE_ATTR_LINKS[attr], recipe_ids)
+        for attr in attrs
+        if attr in RECIPE_ATTR_LINKS
+    }
+    for row in rows:
+        for attr, links in maps.items():
+            row[attr] = links.get(row["id"], [])
+    return rows
+
+
+def attr_map(through, field, recipe_ids):
+    """Return recipe id to `[{"id", "name"}]` for an M2M through model."""
+    links = (
+        through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by(f"{field}_id")
+        .values_list("recipe_id", f"{field}_id", f"{field}__name")
+    )
+    attrs = {}
+    for recipe_id, attr_id, name in links:
+        attrs.setdefault(recipe_id, []).append({"id": attr_id, "name": name})
+    return attrs
+
+
+def _flatten(lists):
+    """Return the items of a list of lists as a single list."""
+    return [value for values in lists for value in values]
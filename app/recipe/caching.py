@@ -0,0 +1,112 @@
+"""
+Per-user versioned response caching for the recipe APIs.
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router
+from django.db.models import F
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+
+def get_data_version(user):
+    """Return the current data version of a user.
+
+    Read from the primary, so a lagging replica never pairs a new cached
+    response or ETag with an old version.
+    """
+    return (
+        get_user_model()
+        .objects.using(DEFAULT_DB_ALIAS)
+        .filter(pk=user.pk)
+        .values_list("data_version", flat=True)
+        .first()
+    )
+
+
+def bump_data_version(user):
+    """Invalidate the cached responses of a user."""
+    get_user_model().objects.filter(pk=user.pk).update(
+        data_version=F("data_version") + 1
+    )
+
+
+class VersionedCacheMixin:
+    """Cache list and detail responses per user and data version.
+
+    The data version is stored on the user and bumped by every successful
+    write through the view, so cached responses never need to be deleted:
+    they are keyed by version and simply stop being used. Responses carry
+    a strong ETag and `If-None-Match` is answered with 304 after a single
+    version lookup. The Accept header is part of the key because it selects
+    the image variant format. Responses read from a replica are neither
+    cached nor tagged, as they may predate the version. Writes made outside
+    the API (admin, shell) do not bump the version and are picked up when
+    cached entries expire.
+    """
+
+    cache_timeout = 300
+
+    def list(self, request, *args, **kwargs):
+        """Return a cached list response when available."""
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return a cached detail response when available."""
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Bump the user's data version after a successful write."""
+        if (
+            request.method not in SAFE_METHODS
+            and status.is_success(response.status_code)
+            and request.user.is_authenticated
+        ):
+            bump_data_version(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        """Serve the response from cache, or render and cache it."""
+        version = get_data_version(request.user)
+        digest = hashlib.sha256(
+            "\n".join(
+                [
+                    str(request.user.pk),
+                    str(version),
+                    request.get_full_path(),
+                    request.accepted_media_type,
+                    request.headers.get("Accept", ""),
+                ]
+            ).encode("utf-8")
+        ).hexdigest()
+        etag = f'"{digest}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        # Compared weakly, as the compression middleware weakens the ETag.
+        if_none_match = [
+            tag[2:] if tag.startswith("W/") else tag
+            for tag in parse_etags(request.headers.get("If-None-Match", ""))
+        ]
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache_key = f"recipe-api:{request.user.pk}:{version}:{digest}"
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data, headers=headers)
+
+        # A lagging replica may render a body older than `version`.
+        from_replica = router.db_for_read(get_user_model()) != DEFAULT_DB_ALIAS
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            if from_replica:
+                headers.pop("ETag")
+            else:
+                cache.set(cache_key, response.data, self.cache_timeout)
+            for header, value in headers.items():
+                response[header] = value
+        return response
@@ -0,0 +1,30 @@
+"""
+Facet counts for the recipe APIs.
+"""
+from django.db.models import Count, Value
+
+from core.models import Tag, Ingredient
+
+FACET_MODELS = {"tags": Tag, "ingredients": Ingredient}
+
+
+def facet_counts(recipes):
+    """Count `recipes` per linked tag and ingredient in a single query.
+
+    The counts of both models are aggregated over the join tables and
+    combined with UNION ALL. Returns a dict of facet name to a list of
+    `{"id", "name", "count"}` items, most used first.
+    """
+    recipe_ids = recipes.order_by().values("pk")
+    queries = [
+        model.objects.filter(recipe__in=recipe_ids)
+        .values_list("id", "name")
+        .annotate(facet=Value(facet), count=Count("recipe"))
+        for facet, model in FACET_MODELS.items()
+    ]
+    combined = queries[0].union(*queries[1:], all=True)
+
+    result = {facet: [] for facet in FACET_MODELS}
+    for pk, name, facet, count in combined.order_by("facet", "-count", "name"):
+        result[facet].append({"id": pk, "name": name, "count": count})
+    return result
@@ -0,0 +1,308 @@
+"""
+Resized variants of recipe images, generated in the background or on demand.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils._os import safe_join
+from PIL import Image, ImageOps
+
+from core.models import Recipe
+from recipe.caching import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+# Variant name to (width, height, crop). Cropped variants fill the box,
+# the others fit inside it.
+VARIANTS = {
+    "thumbnail": (160, 160, True),
+    "card": (480, 360, True),
+    "full": (1200, 1200, False),
+}
+
+# Output formats, preferred first, with their media type and save options.
+FORMATS = {
+    "webp": ("image/webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    "jpeg": (
+        "image/jpeg",
+        {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+    ),
+}
+FALLBACK_FORMAT = "jpeg"
+
+# On-demand resizing: allowed sizes and where resized copies are cached,
+# relative to MEDIA_ROOT.
+RESIZE_WIDTHS = (160, 320, 480, 640, 960, 1280, 1920)
+RESIZE_QUALITIES = (50, 65, 80, 90)
+RESIZE_DEFAULT_QUALITY = 80
+RESIZE_DIR = "resized"
+RESIZE_LOCK_STRIPES = 64
+# Eviction frees the cache down to this share of its budget, so the next
+# copies do not start another pass right away.
+RESIZE_EVICT_TARGET = 0.9
+
+_executor = None
+
+# Size of the resize cache as last measured by this process, plus the
+# copies it created since. None until the first eviction pass.
+_resized_bytes = None
+_resized_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the worker pool, created on first use in each process."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_WORKERS,
+            thread_name_prefix="image-variants",
+        )
+    return _executor
+
+
+def schedule_variants(recipe):
+    """Generate the variants of the recipe image once the upload is committed."""
+    transaction.on_commit(
+        lambda: get_executor().submit(_run, recipe.pk, recipe.image.name)
+    )
+
+
+def _run(recipe_id, image_name):
+    """Generate variants in a worker thread, logging any failure."""
+    try:
+        generate_variants(recipe_id, image_name)
+    except Exception:
+        logger.exception("Failed to generate variants of %s", image_name)
+    finally:
+        connection.close()
+
+
+def render_variant(image, variant, file_format):
+    """Return the bytes of `image` resized to a variant in a format."""
+    width, height, crop = VARIANTS[variant]
+    if crop:
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    else:
+        resized = image.copy()
+        resized.thumbnail((width, height), Image.LANCZOS)
+    output = BytesIO()
+    resized.save(output, **FORMATS[file_format][1])
+    return output.getvalue()
+
+
+def generate_variants(recipe_id, image_name):
+    """Store all variants of a recipe image and record their names.
+
+    The names are only saved if the recipe still has the same image, so
+    a newer upload is never given the variants of an older one. Saving
+    them bumps the owner's data version, so cached responses pick them up.
+    Variants already stored for the image, as when a content-addressed
+    blob is shared by several recipes, are reused.
+    """
+    with default_storage.open(image_name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert("RGB")
+
+    stem = os.path.splitext(image_name)[0]
+    variants = {}
+    for variant in VARIANTS:
+        variants[variant] = {}
+        for file_format in FORMATS:
+            name = f"{stem}/{variant}.{file_format}"
+            if not default_storage.exists(name):
+                name = default_storage.save(
+                    name, ContentFile(render_variant(image, variant, file_format))
+                )
+            variants[variant][file_format] = name
+
+    with transaction.atomic():
+        recorded = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+            image_variants=variants
+        )
+        if recorded:
+            recipe = Recipe.objects.select_related("user").get(pk=recipe_id)
+            bump_data_version(recipe.user)
+    return variants
+
+
+def preferred_format(accept):
+    """Return the best image format allowed by an Accept header."""
+    for file_format, (media_type, _) in FORMATS.items():
+        if media_type in accept:
+            return file_format
+    return FALLBACK_FORMAT
+
+
+def image_url(recipe_id, name, request=None, **params):
+    """Return the URL of a recipe image file on the authenticated endpoint.
+
+    `name` is the stored file. A digest of it is part of the query, so the
+    URL changes with the image and clients never reuse a cached old image.
+    """
+    params["v"] = hashlib.sha256(name.encode("utf-8")).hexdigest()[:12]
+    url = f"{reverse('recipe:recipe-image', args=[recipe_id])}?{urlencode(params)}"
+    return request.build_absolute_uri(url) if request else url
+
+
+def variant_urls(recipe_id, image_variants, request=None):
+    """Return the variant URLs in the best format accepted by `request`.
+
+    Returns None until the variants of the current image are generated.
+    """
+    if not image_variants:
+        return None
+    accept = request.headers.get("Accept", "") if request else ""
+    file_format = preferred_format(accept)
+    return {
+        variant: image_url(
+            recipe_id, names[file_format], request, variant=variant, format=file_format
+        )
+        for variant, names in image_variants.items()
+    }
+
+
+def resize_root():
+    """Return the directory of the on-demand resize cache."""
+    return os.path.join(settings.MEDIA_ROOT, RESIZE_DIR)
+
+
+@contextmanager
+def _file_lock(name, blocking=True):
+    """Hold an exclusive lock shared by all processes and threads.
+
+    Yields False instead of waiting if `blocking` is off and the lock is
+    taken.
+    """
+    lock_dir = os.path.join(resize_root(), ".locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{name}.lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def get_resized(name, width, quality):
+    """Return the path of a stored image resized to `width`, creating it once.
+
+    Concurrent requests for the same copy wait on a lock and reuse the
+    first result. Files are written under a temporary name and renamed so
+    the proxy never serves a partial image. Images are never upscaled.
+    Raises FileNotFoundError for missing sources and ValueError for names
+    without an image extension.
+    """
+    path = safe_join(resize_root(), str(width), str(quality), name)
+    if _touch(path):
+        return path
+
+    stripe = int(hashlib.sha1(path.encode("utf-8")).hexdigest(), 16)
+    with _file_lock(f"resize-{stripe % RESIZE_LOCK_STRIPES}"):
+        if _touch(path):
+            return path
+
+        extension = os.path.splitext(name)[1].lower()
+        file_format = Image.registered_extensions().get(extension)
+        if file_format is None:
+            raise ValueError(f"Not an image file name: {name}")
+        with default_storage.open(name) as source:
+            image = ImageOps.exif_transpose(Image.open(source))
+            if image.width > width:
+                height = round(image.height * width / image.width)
+                image = image.resize((width, height), Image.LANCZOS)
+            if file_format == "JPEG":
+                image = image.convert("RGB")
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as output:
+                image.save(output, format=file_format, quality=quality)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    _record_resized(os.path.getsize(path))
+    return path
+
+
+def _touch(path):
+    """Mark a cached copy as used now, returning False if it is missing."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _record_resized(size):
+    """Count a new copy, starting an eviction pass when over budget."""
+    global _resized_bytes
+    max_bytes = settings.IMAGE_RESIZE_CACHE_BYTES
+    with _resized_lock:
+        if _resized_bytes is not None:
+            _resized_bytes += size
+        over_budget = _resized_bytes is None or _resized_bytes > max_bytes
+    if over_budget:
+        get_executor().submit(evict_resized, max_bytes)
+
+
+def evict_resized(max_bytes):
+    """Delete the least recently used resized images above a size budget.
+
+    Recency is the modification time, which `get_resized` updates on every
+    hit. Copies are deleted until the cache is within `RESIZE_EVICT_TARGET`
+    of the budget. Returns the cache size left, or None if another eviction
+    is running.
+    """
+    global _resized_bytes
+    with _file_lock("evict", blocking=False) as locked:
+        if not locked:
+            return None
+
+        entries = []
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(resize_root()):
+            dirnames[:] = [dirname for dirname in dirnames if dirname != ".locks"]
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total > max_bytes:
+            for used, size, path in sorted(entries):
+                if total <= max_bytes * RESIZE_EVICT_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        with _resized_lock:
+            _resized_bytes = total
+        return total
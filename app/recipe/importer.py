@@ -0,0 +1,84 @@
+"""
+Streaming import of recipes from NDJSON and CSV files.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from recipe import bulk
+
+FORMATS = ["ndjson", "csv"]
+CSV_LIST_SEPARATOR = ";"
+
+
+def detect_format(filename):
+    """Guess the import format from a file name."""
+    return "csv" if filename.lower().endswith(".csv") else "ndjson"
+
+
+def parse_rows(stream, file_format):
+    """Yield recipe payloads from a binary stream, one per row.
+
+    Rows that cannot be parsed are yielded as a `ValidationError`.
+    """
+    lines = codecs.iterdecode(stream, "utf-8")
+    if file_format == "csv":
+        return _parse_csv(lines)
+    return _parse_ndjson(lines)
+
+
+def _parse_ndjson(lines):
+    """Yield one payload per non-empty line of JSON."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield ValidationError({"non_field_errors": [f"Invalid JSON: {exc}"]})
+
+
+def _parse_csv(lines):
+    """Yield one payload per CSV row, splitting the tag and ingredient lists."""
+    for row in csv.DictReader(lines):
+        for field in ("tags", "ingredients"):
+            names = (row.get(field) or "").split(CSV_LIST_SEPARATOR)
+            row[field] = [{"name": name.strip()} for name in names if name.strip()]
+        yield row
+
+
+def import_recipes(job, rows, serializer, chunk_size=500, on_chunk=None):
+    """Import `rows` into the recipes of `job.user`, chunk by chunk.
+
+    Each row is validated with `serializer`. Rows already recorded in
+    `job.rows_done` are skipped, so an interrupted import resumes after its
+    last committed chunk. Each chunk is written and recorded on `job` in a
+    single transaction. `on_chunk` is called after each chunk with the job
+    and a list of `(row number, errors)` for the rows that failed.
+    """
+    rows = islice(rows, job.rows_done, None)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        validated = bulk.validate_recipes(chunk, serializer)
+        valid = [item for item in validated if not isinstance(item, ValidationError)]
+        errors = bulk.item_errors(validated, first_row=job.rows_done + 1)
+        with transaction.atomic():
+            bulk.create_recipes(job.user, valid)
+            job.rows_done += len(chunk)
+            job.created += len(valid)
+            job.failed += len(errors)
+            job.save()
+
+        if on_chunk:
+            on_chunk(job, errors)
+
+    job.finished = True
+    job.save()
+    return job
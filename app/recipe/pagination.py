@@ -0,0 +1,41 @@
+"""
+Pagination for the recipe APIs.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """Keyset pagination enabled when the client asks for a page.
+
+    Lists are returned unpaginated unless the request has a `cursor` or
+    `page_size` query parameter, so existing clients are unaffected.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate the queryset only when pagination was requested."""
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipeCursorPagination(OptInCursorPagination):
+    """Cursor pagination for recipes, newest first or by search relevance."""
+
+    ordering = "-id"
+
+    def get_ordering(self, request, queryset, view):
+        """Keep the relevance ordering of search results."""
+        if request.query_params.get("search"):
+            return ("-rank", "-id")
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(OptInCursorPagination):
+    """Cursor pagination for tags and ingredients, by name."""
+
+    ordering = ("-name", "-id")
@@ -0,0 +1,27 @@
+"""
+Renderers for the recipe APIs.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Render data as newline-delimited JSON, one item per line."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render a list as one line per item, or any other data as one line."""
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return b"".join(self.render_line(item) for item in items)
+
+    @staticmethod
+    def render_line(item):
+        """Render a single item as a line of JSON."""
+        return (json.dumps(item, cls=DjangoJSONEncoder) + "\n").encode("utf-8")
@@ -0,0 +1,66 @@
+"""
+Full-text search for recipes.
+"""
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, Replace
+
+from core.models import Tag, Ingredient
+
+# HTML special characters and their escapes, ampersand first.
+HTML_ESCAPES = [("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;")]
+
+
+def _names(model):
+    """Return a subquery of the space separated names linked to a recipe."""
+    return Subquery(
+        model.objects.filter(recipe=OuterRef("pk"))
+        .values("recipe")
+        .annotate(names=StringAgg("name", " "))
+        .values("names")
+    )
+
+
+def _escape_html(expression):
+    """Return `expression` with HTML special characters escaped in SQL."""
+    for char, escape in HTML_ESCAPES:
+        expression = Replace(expression, Value(char), Value(escape))
+    return expression
+
+
+def update_search_vectors(recipes):
+    """Recompute the search vector of a queryset of recipes in one query."""
+    recipes.update(
+        search_vector=(
+            SearchVector("title", weight="A")
+            + SearchVector("description", weight="B")
+            + SearchVector(_names(Tag), weight="C")
+            + SearchVector(_names(Ingredient), weight="C")
+        )
+    )
+
+
+def search_recipes(queryset, text):
+    """Filter recipes matching `text`, annotated with a rank and a headline.
+
+    The headline is HTML: the recipe text is escaped before the matches are
+    wrapped in `<b>` tags, so it is safe to render. The rank is cast to
+    double precision so it round-trips exactly through pagination cursors.
+    """
+    query = SearchQuery(text, search_type="websearch")
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F("search_vector"), query), FloatField()),
+        headline=SearchHeadline(
+            _escape_html(Concat("title", Value(". "), "description")),
+            query,
+            start_sel="<b>",
+            stop_sel="</b>",
+            max_fragments=2,
+        ),
+    )
@@ -1,12 +1,58 @@
 """
 Serializers for recipe APIs
 """
+from django.db import models
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, RecipeImport
+from recipe import images
+from recipe.importer import FORMATS
+from recipe.search import update_search_vectors
 
 
-class TagSerializer(serializers.ModelSerializer):
+def _param_names(request, name):
+    """Return the comma separated names of a query parameter as a set."""
+    value = request.query_params.get(name, "")
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class SparseFieldsMixin:
+    """Let clients select the fields of read responses.
+
+    `?fields=a,b` keeps only the listed fields and `?omit=c` removes
+    fields. Only safe requests are affected, so writes always validate
+    every field. Unknown names are ignored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        fields = _param_names(request, "fields")
+        omit = _param_names(request, "omit")
+        for name in list(self.fields):
+            if (fields and name not in fields) or name in omit:
+                self.fields.pop(name)
+
+
+class RecipeAttrSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Base serializer for tags and ingredients."""
+
+    def validate_name(self, value):
+        """Reject renaming to a name the user already has."""
+        if self.instance is not None:
+            model = self.Meta.model
+            duplicates = model.objects.filter(user=self.instance.user, name=value)
+            if duplicates.exclude(pk=self.instance.pk).exists():
+                raise serializers.ValidationError(
+                    f"A {model._meta.verbose_name} with this name already exists."
+                )
+        return value
+
+
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tags."""
 
     class Meta:
@@ -15,8 +61,8 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class IngredientSerializer(serializers.ModelSerializer):
-    """Serializer for tags."""
+class IngredientSerializer(RecipeAttrSerializer):
+    """Serializer for ingredients."""
 
     class Meta:
         model = Ingredient
@@ -24,7 +70,25 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class TagCountSerializer(TagSerializer):
+    """Serializer for tags with the number of recipes using them."""
+
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ["recipe_count"]
+
+
+class IngredientCountSerializer(IngredientSerializer):
+    """Serializer for ingredients with the number of recipes using them."""
+
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ["recipe_count"]
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
 
     tags = TagSerializer(many=True, required=False)
@@ -36,59 +100,222 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
+class RecipeSearchSerializer(RecipeSerializer):
+    """Serializer for recipe search results."""
+
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ["rank", "headline"]
+
+
+class RowSerializer:
+    """Read-only fast path giving the output of a serializer for plain rows.
+
+    Rows are dicts from `values()` with nested fields, such as tags and
+    ingredients, already attached in their final form. Each other field is
+    converted with the serializer's own field, in field order, so the data
+    is the same as serializing model instances without building fields
+    and nested serializers for every row.
+    """
+
+    def __init__(self, serializer_class, context=None):
+        self.fields = [
+            (
+                name,
+                None
+                if isinstance(field, serializers.BaseSerializer)
+                else field.to_representation,
+            )
+            for name, field in serializer_class(context=context or {}).fields.items()
+        ]
+
+    @property
+    def value_fields(self):
+        """Return the names of the fields to load with `values()`."""
+        return [name for name, convert in self.fields if convert is not None]
+
+    @property
+    def nested_fields(self):
+        """Return the names of the fields expected on the rows already."""
+        return [name for name, convert in self.fields if convert is None]
+
+    def to_representation(self, rows):
+        """Return the serialized data of a list of rows."""
+        return [
+            {
+                name: row[name]
+                if convert is None or row[name] is None
+                else convert(row[name])
+                for name, convert in self.fields
+            }
+            for row in rows
+        ]
+
+
+class RecipeImageField(serializers.ImageField):
+    """Image field shown as the URL of the recipe's authenticated image."""
+
+    def to_representation(self, value):
+        """Return the image URL of the recipe, or None without an image."""
+        if not value:
+            return None
+        return images.image_url(
+            value.instance.pk, value.name, self.context.get("request")
+        )
+
+
+# Model serializer field mapping showing recipe images by their endpoint.
+RECIPE_FIELD_MAPPING = {
+    **serializers.ModelSerializer.serializer_field_mapping,
+    models.ImageField: RecipeImageField,
+}
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view."""
 
+    serializer_field_mapping = RECIPE_FIELD_MAPPING
+    variants = serializers.SerializerMethodField()
+
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ["description", "image"]
+        fields = RecipeSerializer.Meta.fields + ["description", "image", "variants"]
+
+    def get_variants(self, recipe) -> dict:
+        """Return the image variant URLs in the best format the client accepts."""
+        return images.variant_urls(
+            recipe.pk, recipe.image_variants, self.context.get("request")
+        )
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _get_or_create_tags(self, tags):
         """Handle getting or creating tags as needed."""
         auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, _ = Tag.objects.get_or_create(user=auth_user, **tag,)
-            recipe.tags.add(tag_obj)
+        tag_objs = Tag.objects.get_or_create_many(
+            auth_user, [tag["name"] for tag in tags]
+        )
+        return tag_objs.values()
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        """Handle getting or creating tags as needed."""
+    def _get_or_create_ingredients(self, ingredients):
+        """Handle getting or creating ingredients as needed."""
         auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ingredient_obj, _ = Ingredient.objects.get_or_create(
-                user=auth_user, **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        ingredient_objs = Ingredient.objects.get_or_create_many(
+            auth_user, [ingredient["name"] for ingredient in ingredients]
+        )
+        return ingredient_objs.values()
 
     def create(self, validated_data):
         """Create a recipe."""
         tags = validated_data.pop("tags", [])
         ingredients = validated_data.pop("ingredients", [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        recipe.tags.add(*self._get_or_create_tags(tags))
+        recipe.ingredients.add(*self._get_or_create_ingredients(ingredients))
+        update_search_vectors(Recipe.objects.filter(pk=recipe.pk))
         return recipe
 
     def update(self, instance, validated_data):
-        """Update recipe."""
+        """Update recipe, writing only the rows that changed."""
         tags = validated_data.pop("tags", None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_tags(tags))
 
         ingredients = validated_data.pop("ingredients", None)
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            instance.ingredients.set(self._get_or_create_ingredients(ingredients))
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        changed_fields = [
+            attr
+            for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed_fields:
+            setattr(instance, attr, validated_data[attr])
 
-        instance.save()
+        if changed_fields:
+            instance.save(update_fields=changed_fields)
+
+        searched_fields = {"title", "description"}.intersection(changed_fields)
+        if tags is not None or ingredients is not None or searched_fields:
+            update_search_vectors(Recipe.objects.filter(pk=instance.pk))
         return instance
 
 
+class RecipeBatchResultSerializer(serializers.Serializer):
+    """Serializer for the result of one item of a recipe batch."""
+
+    row = serializers.IntegerField()
+    id = serializers.IntegerField(required=False)
+    errors = serializers.DictField(required=False)
+
+
+class RecipeFacetSerializer(serializers.Serializer):
+    """Serializer for the recipe count of a tag or ingredient."""
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class RecipeFacetsSerializer(serializers.Serializer):
+    """Serializer for the tag and ingredient facets of recipes."""
+
+    tags = RecipeFacetSerializer(many=True)
+    ingredients = RecipeFacetSerializer(many=True)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Serializer for importing recipes from a file."""
+
+    file = serializers.FileField(write_only=True)
+    format = serializers.ChoiceField(choices=FORMATS, required=False, write_only=True)
+    resume = serializers.IntegerField(required=False, write_only=True)
+
+    class Meta:
+        model = RecipeImport
+        fields = [
+            "id",
+            "source",
+            "rows_done",
+            "created",
+            "failed",
+            "finished",
+            "file",
+            "format",
+            "resume",
+        ]
+        read_only_fields = [
+            "id",
+            "source",
+            "rows_done",
+            "created",
+            "failed",
+            "finished",
+        ]
+
+    def validate_resume(self, value):
+        """Return the unfinished import of the user to resume."""
+        auth_user = self.context["request"].user
+        try:
+            return RecipeImport.objects.get(id=value, user=auth_user, finished=False)
+        except RecipeImport.DoesNotExist:
+            raise serializers.ValidationError("No unfinished import with this id.")
+
+    def create(self, validated_data):
+        """Return the import to resume, or start a new one."""
+        job = validated_data.get("resume")
+        if job is not None:
+            return job
+        return RecipeImport.objects.create(
+            user=validated_data["user"], source=validated_data["file"].name,
+        )
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
 
+    serializer_field_mapping = RECIPE_FIELD_MAPPING
+
     class Meta:
         model = Recipe
         fields = ['id', 'image']
@@ -0,0 +1,94 @@
+"""
+Tests for the async recipe views.
+
+The views run in worker threads with their own database connections, so
+the tests commit their data.
+"""
+import asyncio
+import threading
+
+import pytest
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from rest_framework import status
+
+from conftest import create_recipe, create_user
+from core import offload
+from recipe.tests.test_images import sample_image
+
+RECIPES_URL = reverse("recipe:recipe-list")
+ASYNC_RECIPES_URL = reverse("recipe:async-recipe-list")
+
+
+def async_detail_url(recipe_id):
+    """Create and return an async recipe detail URL."""
+    return reverse("recipe:async-recipe-detail", args=[recipe_id])
+
+
+def async_image_upload_url(recipe_id):
+    """Create and return an async image upload URL."""
+    return reverse("recipe:async-recipe-upload-image", args=[recipe_id])
+
+
+def test_run_in_thread():
+    """Test blocking calls run in the worker pool, not on the event loop."""
+    result = asyncio.run(offload.run_in_thread(threading.current_thread))
+
+    assert result.name.startswith("async-offload")
+    assert result is not threading.current_thread()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_list_same_as_sync(api_client, authenticated_user):
+    """Test the async recipe list returns the same data as the sync one."""
+    for i in range(3):
+        create_recipe(user=authenticated_user, title=f"Recipe {i}")
+    create_recipe(user=create_user(email="other@example.com"))
+    params = {"page_size": 2, "fields": "id,title,tags"}
+
+    res = api_client.get(ASYNC_RECIPES_URL, params)
+
+    assert res.status_code == status.HTTP_200_OK
+    expected = api_client.get(RECIPES_URL, params).json()["results"]
+    assert res.json()["results"] == expected
+    assert res.json()["next"].startswith(f"http://testserver{ASYNC_RECIPES_URL}")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_detail(api_client, authenticated_user):
+    """Test the async detail returns the user's recipe only."""
+    recipe = create_recipe(user=authenticated_user)
+    other = create_recipe(user=create_user(email="other@example.com"))
+
+    res = api_client.get(async_detail_url(recipe.id))
+    missing = api_client.get(async_detail_url(other.id))
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.json()["title"] == recipe.title
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_requires_auth(api_client):
+    """Test the async views require authentication."""
+    res = api_client.get(ASYNC_RECIPES_URL)
+
+    assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_upload_image(api_client, authenticated_user, settings, tmp_path, mocker):
+    """Test uploading an image through the async view."""
+    settings.MEDIA_ROOT = str(tmp_path)
+    mocker.patch("recipe.images.get_executor")
+    recipe = create_recipe(user=authenticated_user)
+
+    res = api_client.post(
+        async_image_upload_url(recipe.id),
+        {"image": ContentFile(sample_image(), name="photo.jpg")},
+        format="multipart",
+    )
+
+    assert res.status_code == status.HTTP_200_OK
+    recipe.refresh_from_db()
+    assert recipe.image.name.endswith(".jpg")
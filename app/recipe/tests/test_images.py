@@ -0,0 +1,371 @@
+"""
+Tests for recipe image delivery, variants and on-demand resizing.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import os
+import threading
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+
+from conftest import create_recipe, create_user
+from core.models import Recipe
+from recipe import images
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    """Create and return an image upload URL."""
+    return reverse("recipe:recipe-upload-image", args=[recipe_id])
+
+
+def image_url(recipe_id):
+    """Create and return an authenticated image URL."""
+    return reverse("recipe:recipe-image", args=[recipe_id])
+
+
+def sample_image(size=(1600, 900)):
+    """Return the bytes of a JPEG image of the given size."""
+    output = BytesIO()
+    Image.new("RGB", size, "orange").save(output, format="JPEG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    """Store uploaded files in a temporary directory."""
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def recipe_with_image(media_root, recipe):
+    """Return a recipe with a stored image."""
+    recipe.image.save("photo.jpg", ContentFile(sample_image()))
+    return recipe
+
+
+@pytest.mark.django_db
+def test_upload_image_schedules_variants(
+    api_client, media_root, recipe, mocker, django_capture_on_commit_callbacks
+):
+    """Test uploading an image generates its variants after the commit."""
+    get_executor = mocker.patch("recipe.images.get_executor")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        res = api_client.post(
+            image_upload_url(recipe.id),
+            {"image": ContentFile(sample_image(), name="photo.jpg")},
+            format="multipart",
+        )
+
+    assert res.status_code == status.HTTP_200_OK
+    recipe.refresh_from_db()
+    get_executor.return_value.submit.assert_called_once_with(
+        images._run, recipe.id, recipe.image.name
+    )
+
+
+@pytest.mark.django_db
+def test_generate_variants(recipe_with_image):
+    """Test every variant is stored in every format."""
+    variants = images.generate_variants(
+        recipe_with_image.id, recipe_with_image.image.name
+    )
+
+    recipe_with_image.refresh_from_db()
+    assert recipe_with_image.image_variants == variants
+    for variant, (width, height, crop) in images.VARIANTS.items():
+        for file_format in images.FORMATS:
+            with default_storage.open(variants[variant][file_format]) as stored:
+                image = Image.open(stored)
+                assert image.format == file_format.upper()
+                assert image.width <= width and image.height <= height
+    with default_storage.open(variants["card"]["jpeg"]) as stored:
+        assert Image.open(stored).size == (480, 360)
+    with default_storage.open(variants["full"]["webp"]) as stored:
+        assert Image.open(stored).size == (1200, 675)
+
+
+@pytest.mark.django_db
+def test_generate_variants_for_replaced_image(recipe_with_image):
+    """Test variants of a replaced image are not recorded."""
+    old_name = recipe_with_image.image.name
+    recipe_with_image.image.save("new.jpg", ContentFile(sample_image()))
+
+    images.generate_variants(recipe_with_image.id, old_name)
+
+    recipe_with_image.refresh_from_db()
+    assert recipe_with_image.image_variants == {}
+
+
+@pytest.mark.django_db
+def test_recipe_detail_variants_pending(api_client, recipe_with_image):
+    """Test variants are null until they are generated."""
+    res = api_client.get(detail_url(recipe_with_image.id))
+
+    assert res.data["variants"] is None
+
+
+@pytest.mark.django_db
+def test_recipe_detail_variants_invalidate_cache(api_client, recipe_with_image):
+    """Test generated variants replace the cached detail and its ETag."""
+    pending = api_client.get(detail_url(recipe_with_image.id))
+    assert pending.data["variants"] is None
+
+    images.generate_variants(recipe_with_image.id, recipe_with_image.image.name)
+    res = api_client.get(
+        detail_url(recipe_with_image.id), HTTP_IF_NONE_MATCH=pending["ETag"]
+    )
+
+    assert res.status_code == status.HTTP_200_OK
+    assert set(res.data["variants"]) == set(images.VARIANTS)
+    assert res["ETag"] != pending["ETag"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "accept,extension",
+    [
+        ("application/json", ".jpeg"),
+        ("application/json, image/webp", ".webp"),
+    ],
+)
+def test_recipe_detail_variants_format(
+    api_client, recipe_with_image, accept, extension
+):
+    """Test variant URLs use WebP only for clients accepting it."""
+    images.generate_variants(recipe_with_image.id, recipe_with_image.image.name)
+
+    res = api_client.get(detail_url(recipe_with_image.id), HTTP_ACCEPT=accept)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert set(res.data["variants"]) == set(images.VARIANTS)
+    for variant, url in res.data["variants"].items():
+        assert url.startswith(f"http://testserver{image_url(recipe_with_image.id)}?")
+        assert f"variant={variant}&format={extension[1:]}&v=" in url
+
+
+@pytest.mark.django_db
+def test_recipe_detail_image_url(api_client, recipe_with_image):
+    """Test the image is linked through the authenticated endpoint."""
+    res = api_client.get(detail_url(recipe_with_image.id))
+
+    assert res.data["image"].startswith(
+        f"http://testserver{image_url(recipe_with_image.id)}?v="
+    )
+    assert "static/media" not in res.data["image"]
+
+
+@pytest.mark.django_db
+def test_recipe_image_variant(api_client, recipe_with_image):
+    """Test variants are served from the image endpoint."""
+    images.generate_variants(recipe_with_image.id, recipe_with_image.image.name)
+    url = api_client.get(detail_url(recipe_with_image.id)).data["variants"]["card"]
+
+    res = api_client.get(url, HTTP_ACCEPT="image/*")
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["Content-Type"] == "image/jpeg"
+    image = Image.open(BytesIO(b"".join(res.streaming_content)))
+    assert image.size == (480, 360)
+
+
+@pytest.mark.django_db
+def test_recipe_image_variant_pending(api_client, recipe_with_image):
+    """Test variants not generated yet return 404."""
+    res = api_client.get(image_url(recipe_with_image.id), {"variant": "card"})
+
+    assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_resized_image(api_client, recipe_with_image, mocker):
+    """Test an image is resized on first request and cached on disk."""
+    mocker.patch("recipe.images.get_executor")
+    name = recipe_with_image.image.name
+
+    res = api_client.get(
+        image_url(recipe_with_image.id), {"width": 320, "quality": 80}
+    )
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["Content-Type"] == "image/jpeg"
+    assert res["Cache-Control"] == "private, max-age=86400"
+    image = Image.open(BytesIO(b"".join(res.streaming_content)))
+    assert image.size == (320, 180)
+    cached = os.path.join(images.resize_root(), "320", "80", name)
+    assert os.path.exists(cached)
+
+
+@pytest.mark.django_db
+def test_resized_image_accel_redirect(api_client, recipe_with_image, settings):
+    """Test resized copies are handed off to the proxy when enabled."""
+    settings.MEDIA_ACCEL_REDIRECT = True
+    name = recipe_with_image.image.name
+
+    res = api_client.get(image_url(recipe_with_image.id), {"width": 320})
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["X-Accel-Redirect"] == f"/protected-media/resized/320/80/{name}"
+
+
+@pytest.mark.django_db
+def test_resized_image_requires_auth(client, recipe_with_image):
+    """Test resized copies are not served without authentication."""
+    res = client.get(image_url(recipe_with_image.id), {"width": 320})
+
+    assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_resized_image_not_upscaled(media_root, mocker):
+    """Test images narrower than the requested width keep their size."""
+    mocker.patch("recipe.images.get_executor")
+    name = default_storage.save("uploads/recipe/small.png", ContentFile(b""))
+    with default_storage.open(name, "wb") as output:
+        Image.new("RGB", (100, 50)).save(output, format="PNG")
+
+    path = images.get_resized(name, 480, 80)
+
+    assert Image.open(path).size == (100, 50)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params", [{"width": 321}, {"width": 320, "quality": 81}, {"width": "wide"}]
+)
+def test_resized_image_size_not_allowed(api_client, recipe_with_image, params):
+    """Test disallowed sizes return 404."""
+    res = api_client.get(image_url(recipe_with_image.id), params)
+
+    assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ["uploads/recipe/missing.jpg", "uploads/notes.txt"])
+def test_resized_image_source_not_found(api_client, media_root, recipe, name):
+    """Test missing or unreadable sources return 404."""
+    Recipe.objects.filter(pk=recipe.pk).update(image=name)
+
+    res = api_client.get(image_url(recipe.id), {"width": 320})
+
+    assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_resized_image_coalesces_concurrent_requests(media_root, mocker):
+    """Test concurrent requests for the same copy resize it once."""
+    mocker.patch("recipe.images.get_executor")
+    name = default_storage.save("uploads/recipe/photo.jpg", ContentFile(sample_image()))
+    resize = mocker.spy(Image.Image, "resize")
+    barrier = threading.Barrier(8)
+
+    def request():
+        barrier.wait()
+        return images.get_resized(name, 640, 65)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = list(pool.map(lambda _: request(), range(8)))
+
+    assert len(set(paths)) == 1
+    assert resize.call_count == 1
+
+
+def test_evict_resized(media_root, mocker):
+    """Test eviction removes the least recently used copies over budget."""
+    mocker.patch("recipe.images._resized_bytes", None)
+    root = images.resize_root()
+    for age, name in enumerate(["new.jpg", "middle.jpg", "old.jpg"]):
+        path = os.path.join(root, "320", "80", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as output:
+            output.write(b"x" * 100)
+        os.utime(path, (1000 - age, 1000 - age))
+
+    remaining = images.evict_resized(max_bytes=250)
+
+    assert remaining == images._resized_bytes == 200
+    assert sorted(os.listdir(os.path.join(root, "320", "80"))) == [
+        "middle.jpg",
+        "new.jpg",
+    ]
+
+
+def test_resized_image_hit_marks_use(media_root, mocker):
+    """Test serving a cached copy makes it the most recently used."""
+    mocker.patch("recipe.images.get_executor")
+    name = default_storage.save("uploads/recipe/photo.jpg", ContentFile(sample_image()))
+    path = images.get_resized(name, 320, 80)
+    os.utime(path, (1000, 1000))
+
+    assert images.get_resized(name, 320, 80) == path
+    assert os.stat(path).st_mtime > 1000
+
+
+def test_resized_image_evicts_only_over_budget(media_root, mocker, settings):
+    """Test new copies start an eviction pass only once over budget."""
+    executor = mocker.patch("recipe.images.get_executor").return_value
+    mocker.patch("recipe.images._resized_bytes", 0)
+    name = default_storage.save("uploads/recipe/photo.jpg", ContentFile(sample_image()))
+    settings.IMAGE_RESIZE_CACHE_BYTES = 10 ** 6
+
+    images.get_resized(name, 320, 80)
+    executor.submit.assert_not_called()
+
+    settings.IMAGE_RESIZE_CACHE_BYTES = 1
+    images.get_resized(name, 480, 80)
+    executor.submit.assert_called_once_with(images.evict_resized, 1)
+
+
+@pytest.mark.django_db
+def test_recipe_image_streamed(api_client, recipe_with_image):
+    """Test the owner gets the image from Django without the proxy."""
+    res = api_client.get(image_url(recipe_with_image.id), HTTP_ACCEPT="image/*")
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["Content-Type"] == "image/jpeg"
+    assert res["Cache-Control"] == "private, max-age=86400"
+    assert b"".join(res.streaming_content) == sample_image()
+
+
+@pytest.mark.django_db
+def test_recipe_image_accel_redirect(api_client, recipe_with_image, settings):
+    """Test the transfer is handed off to the proxy when enabled."""
+    settings.MEDIA_ACCEL_REDIRECT = True
+
+    res = api_client.get(image_url(recipe_with_image.id))
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["X-Accel-Redirect"] == (
+        f"/protected-media/{recipe_with_image.image.name}"
+    )
+    assert res["Content-Type"] == "image/jpeg"
+    assert res.content == b""
+
+
+@pytest.mark.django_db
+def test_recipe_image_other_user(api_client, authenticated_user, media_root):
+    """Test images of other users' recipes are not served."""
+    other = create_recipe(user=create_user(email="other@example.com"))
+    other.image.save("photo.jpg", ContentFile(sample_image()))
+
+    res = api_client.get(image_url(other.id), HTTP_ACCEPT="image/jpeg")
+
+    assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_recipe_image_missing(api_client, recipe):
+    """Test recipes without an image return 404."""
+    res = api_client.get(image_url(recipe.id))
+
+    assert res.status_code == status.HTTP_404_NOT_FOUND
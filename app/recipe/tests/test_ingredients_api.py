@@ -8,7 +8,7 @@ from rest_framework import status
 
 from core.models import Ingredient, Recipe
 from recipe.serializers import IngredientSerializer
-from conftest import create_user
+from conftest import create_recipe, create_user
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
 
@@ -126,3 +126,31 @@ def test_filtered_ingredients_unique(api_client, authenticated_user):
     res = api_client.get(INGREDIENTS_URL, {"assigned_only": 1})
 
     assert len(res.data) == 1
+
+
+@pytest.mark.django_db
+def test_filter_ingredients_unused(api_client, authenticated_user):
+    """Test listing ingredients not used by any recipe."""
+    used = Ingredient.objects.create(user=authenticated_user, name="Eggs")
+    unused = Ingredient.objects.create(user=authenticated_user, name="Flour")
+    create_recipe(user=authenticated_user).ingredients.add(used)
+
+    res = api_client.get(INGREDIENTS_URL, {"unused_only": 1})
+
+    assert res.data == [IngredientSerializer(unused).data]
+
+
+@pytest.mark.django_db
+def test_list_ingredients_with_counts(api_client, authenticated_user):
+    """Test listing ingredients with their recipe counts."""
+    eggs = Ingredient.objects.create(user=authenticated_user, name="Eggs")
+    Ingredient.objects.create(user=authenticated_user, name="Flour")
+    for _ in range(2):
+        create_recipe(user=authenticated_user).ingredients.add(eggs)
+
+    res = api_client.get(INGREDIENTS_URL, {"with_counts": 1})
+
+    assert [(item["name"], item["recipe_count"]) for item in res.data] == [
+        ("Flour", 0),
+        ("Eggs", 2),
+    ]
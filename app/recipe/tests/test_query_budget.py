@@ -0,0 +1,116 @@
+"""
+Tests for the number of queries run by the recipe and user APIs.
+"""
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+
+from core.models import Tag, Ingredient
+from conftest import create_recipe, create_user, query_budget
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+ME_URL = reverse("user:me")
+CREATE_USER_URL = reverse("user:create")
+TOKEN_URL = reverse("user:token")
+
+# Declared query budgets for read endpoints, independent of the result size.
+# Cached endpoints spend one query on the user's data version.
+READ_BUDGETS = [
+    (RECIPES_URL, 4),
+    (TAGS_URL, 2),
+    (INGREDIENTS_URL, 2),
+    (ME_URL, 0),
+]
+
+
+def create_recipes_with_attrs(user, count, prefix=""):
+    """Create `count` recipes, each with its own tags and ingredients."""
+    recipes = []
+    for i in range(count):
+        recipe = create_recipe(user=user, title=f"Recipe {i}")
+        for j in range(2):
+            recipe.tags.add(Tag.objects.create(user=user, name=f"{prefix}Tag {i}-{j}"))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=user, name=f"{prefix}Ingredient {i}-{j}")
+            )
+        recipes.append(recipe)
+    return recipes
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url,budget", READ_BUDGETS)
+def test_list_endpoints_within_budget(api_client, authenticated_user, url, budget):
+    """Test read endpoints stay within their declared query budget."""
+    create_recipes_with_attrs(authenticated_user, 10)
+
+    with query_budget(budget):
+        res = api_client.get(url)
+
+    assert res.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", [RECIPES_URL, TAGS_URL, INGREDIENTS_URL])
+def test_query_count_independent_of_results(api_client, authenticated_user, url):
+    """Test the number of queries does not grow with the number of results."""
+    create_recipes_with_attrs(authenticated_user, 1)
+    with query_budget(100) as small:
+        api_client.get(url)
+
+    create_recipes_with_attrs(authenticated_user, 10, prefix="More ")
+    cache.clear()
+    with query_budget(100) as large:
+        api_client.get(url)
+
+    assert len(large.captured_queries) == len(small.captured_queries)
+
+
+@pytest.mark.django_db
+def test_recipe_detail_within_budget(api_client, authenticated_user):
+    """Test retrieving a recipe stays within its query budget."""
+    recipe = create_recipes_with_attrs(authenticated_user, 1)[0]
+    url = reverse("recipe:recipe-detail", args=[recipe.id])
+
+    with query_budget(4):
+        res = api_client.get(url)
+
+    assert res.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_update_me_within_budget(api_client, authenticated_user):
+    """Test updating the authenticated user stays within its query budget."""
+    with query_budget(3):
+        res = api_client.patch(ME_URL, {"name": "Updated name"})
+
+    assert res.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_create_user_within_budget(api_client):
+    """Test creating a user stays within its query budget."""
+    payload = {
+        "email": "test@example.com",
+        "password": "testpass123",
+        "name": "Test Name",
+    }
+
+    with query_budget(2):
+        res = api_client.post(CREATE_USER_URL, payload)
+
+    assert res.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db
+def test_create_token_within_budget(api_client):
+    """Test creating a token stays within its query budget."""
+    create_user(email="test@example.com", password="testpass123")
+    payload = {"email": "test@example.com", "password": "testpass123"}
+
+    with query_budget(5):
+        res = api_client.post(TOKEN_URL, payload)
+
+    assert res.status_code == status.HTTP_200_OK
@@ -2,23 +2,31 @@
 Tests for recipe APIs.
 """
 from decimal import Decimal
+import json
 import tempfile
 import os
 
 from PIL import Image
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Prefetch
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, RecipeImport
+from recipe.search import search_recipes, update_search_vectors
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
+    RecipeSearchSerializer,
 )
-from conftest import create_recipe, create_user
+from recipe.views import RecipeViewSet
+from conftest import create_recipe, create_user, query_budget
 
 
 RECIPES_URL = reverse("recipe:recipe-list")
+FACETS_URL = reverse("recipe:recipe-facets")
 
 
 def detail_url(recipe_id):
@@ -429,3 +437,640 @@ def test_filter_by_ingredients(api_client, authenticated_user):
     assert s1.data in res.data
     assert s2.data in res.data
     assert s3.data not in res.data
+
+
+@pytest.mark.django_db
+def test_list_recipes_unpaginated_by_default(api_client, authenticated_user):
+    """Test recipes are returned as a plain list without pagination params."""
+    create_recipe(user=authenticated_user)
+
+    res = api_client.get(RECIPES_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert isinstance(res.data, list)
+
+
+@pytest.mark.django_db
+def test_list_recipes_cursor_pagination(api_client, authenticated_user):
+    """Test walking the recipe list page by page with cursors."""
+    recipes = [create_recipe(user=authenticated_user) for _ in range(5)]
+    expected_ids = [recipe.id for recipe in reversed(recipes)]
+
+    res = api_client.get(RECIPES_URL, {"page_size": 2})
+    seen_ids = []
+    while True:
+        assert res.status_code == status.HTTP_200_OK
+        seen_ids += [item["id"] for item in res.data["results"]]
+        if not res.data["next"]:
+            break
+        res = api_client.get(res.data["next"])
+
+    assert seen_ids == expected_ids
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_stable_under_inserts(api_client, authenticated_user):
+    """Test new recipes do not shift the following pages."""
+    recipes = [create_recipe(user=authenticated_user) for _ in range(4)]
+
+    res = api_client.get(RECIPES_URL, {"page_size": 2})
+    create_recipe(user=authenticated_user)
+    res = api_client.get(res.data["next"])
+
+    assert [item["id"] for item in res.data["results"]] == [
+        recipes[1].id,
+        recipes[0].id,
+    ]
+
+
+@pytest.mark.django_db
+def test_create_recipe_query_count_constant(api_client, authenticated_user):
+    """Test creating a recipe costs the same queries for any number of tags."""
+
+    def payload(count):
+        return {
+            "title": "Stew",
+            "time_minutes": 60,
+            "price": Decimal("8.00"),
+            "tags": [{"name": f"Tag {i}"} for i in range(count)],
+            "ingredients": [{"name": f"Ingredient {i}"} for i in range(count)],
+        }
+
+    with query_budget(100) as small:
+        api_client.post(RECIPES_URL, payload(1), format="json")
+    with query_budget(100) as large:
+        res = api_client.post(RECIPES_URL, payload(30), format="json")
+
+    assert res.status_code == status.HTTP_201_CREATED
+    assert len(large.captured_queries) == len(small.captured_queries)
+    recipe = Recipe.objects.get(id=res.data["id"])
+    assert recipe.tags.count() == 30
+    assert recipe.ingredients.count() == 30
+
+
+@pytest.mark.django_db
+def test_create_recipe_with_duplicate_tag_names(api_client, authenticated_user):
+    """Test repeated tag names in a payload resolve to a single tag."""
+    payload = {
+        "title": "Pancakes",
+        "time_minutes": 20,
+        "price": Decimal("3.00"),
+        "tags": [{"name": "Breakfast"}, {"name": "Breakfast"}],
+    }
+    res = api_client.post(RECIPES_URL, payload, format="json")
+
+    assert res.status_code == status.HTTP_201_CREATED
+    assert Tag.objects.filter(user=authenticated_user).count() == 1
+    recipe = Recipe.objects.get(id=res.data["id"])
+    assert recipe.tags.count() == 1
+
+
+@pytest.mark.django_db
+def test_update_tags_keeps_unchanged_links(api_client, authenticated_user, recipe):
+    """Test updating tags only deletes and inserts the links that changed."""
+    tag_keep = Tag.objects.create(user=authenticated_user, name="Keep")
+    tag_drop = Tag.objects.create(user=authenticated_user, name="Drop")
+    recipe.tags.add(tag_keep, tag_drop)
+    through = Recipe.tags.through
+    kept_link = through.objects.get(recipe=recipe, tag=tag_keep)
+
+    payload = {"tags": [{"name": "Keep"}, {"name": "New"}]}
+    res = api_client.patch(detail_url(recipe.id), payload, format="json")
+
+    assert res.status_code == status.HTTP_200_OK
+    assert through.objects.filter(id=kept_link.id, tag=tag_keep).exists()
+    assert set(recipe.tags.values_list("name", flat=True)) == {"Keep", "New"}
+
+
+@pytest.mark.django_db
+def test_update_saves_only_changed_fields(api_client, authenticated_user, recipe):
+    """Test a partial update only writes the changed columns."""
+    payload = {"title": "Changed title", "link": recipe.link}
+
+    with query_budget(100) as context:
+        res = api_client.patch(detail_url(recipe.id), payload)
+
+    assert res.status_code == status.HTTP_200_OK
+    updates = [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith('UPDATE "core_recipe"')
+        and '"search_vector"' not in query["sql"]
+    ]
+    assert len(updates) == 1
+    assert '"title"' in updates[0]
+    assert '"link"' not in updates[0]
+
+
+@pytest.mark.django_db
+def test_update_without_changes_skips_save(api_client, authenticated_user, recipe):
+    """Test an update with unchanged values does not write the recipe."""
+    payload = {"title": recipe.title}
+
+    with query_budget(100) as context:
+        res = api_client.patch(detail_url(recipe.id), payload)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert not any(
+        query["sql"].startswith('UPDATE "core_recipe"')
+        for query in context.captured_queries
+    )
+
+
+BATCH_URL = reverse("recipe:recipe-batch")
+
+
+def batch_item(i, **params):
+    """Return a recipe payload for the batch endpoint."""
+    item = {
+        "title": f"Recipe {i}",
+        "time_minutes": 10,
+        "price": "4.50",
+        "tags": [{"name": "Dinner"}, {"name": f"Tag {i}"}],
+        "ingredients": [{"name": "Salt"}],
+    }
+    item.update(params)
+    return item
+
+
+@pytest.mark.django_db
+def test_batch_create_recipes(api_client, authenticated_user):
+    """Test creating many recipes in one request."""
+    payload = [batch_item(i) for i in range(3)]
+
+    res = api_client.post(BATCH_URL, payload, format="json")
+
+    assert res.status_code == status.HTTP_201_CREATED
+    assert len(res.data) == 3
+    for item, result in zip(payload, res.data):
+        recipe = Recipe.objects.get(id=result["id"], user=authenticated_user)
+        assert recipe.title == item["title"]
+        assert set(recipe.tags.values_list("name", flat=True)) == {
+            tag["name"] for tag in item["tags"]
+        }
+        assert recipe.ingredients.get().name == "Salt"
+    assert Tag.objects.filter(user=authenticated_user, name="Dinner").count() == 1
+
+
+@pytest.mark.django_db
+def test_batch_create_reports_item_errors(api_client, authenticated_user):
+    """Test invalid items are reported while valid ones are created."""
+    payload = [batch_item(0), batch_item(1, time_minutes="soon")]
+
+    res = api_client.post(BATCH_URL, payload, format="json")
+
+    assert res.status_code == status.HTTP_207_MULTI_STATUS
+    assert Recipe.objects.filter(id=res.data[0]["id"]).exists()
+    assert "time_minutes" in res.data[1]["errors"]
+    assert [result["row"] for result in res.data] == [1, 2]
+    assert Recipe.objects.filter(user=authenticated_user).count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("item", [None, "recipe"])
+def test_batch_create_reports_item_errors_by_field(
+    api_client, authenticated_user, item
+):
+    """Test errors about a whole item are reported as non field errors."""
+    res = api_client.post(BATCH_URL, [batch_item(0), item], format="json")
+
+    assert res.status_code == status.HTTP_207_MULTI_STATUS
+    assert list(res.data[1]["errors"]) == ["non_field_errors"]
+    assert res.data[1]["row"] == 2
+
+
+@pytest.mark.django_db
+def test_batch_create_requires_list(api_client, authenticated_user):
+    """Test the batch endpoint rejects a single object."""
+    res = api_client.post(BATCH_URL, batch_item(0), format="json")
+
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+def test_batch_create_query_count_constant(api_client, authenticated_user):
+    """Test the batch endpoint runs the same queries for any batch size."""
+
+    def items(numbers):
+        return [
+            batch_item(i, ingredients=[{"name": f"Ingredient {i}"}]) for i in numbers
+        ]
+
+    with query_budget(100) as small:
+        api_client.post(BATCH_URL, items([0]), format="json")
+    with query_budget(100) as large:
+        res = api_client.post(BATCH_URL, items(range(1, 51)), format="json")
+
+    assert res.status_code == status.HTTP_201_CREATED
+    assert len(large.captured_queries) == len(small.captured_queries)
+
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def read_export(res):
+    """Return the recipes of a streamed NDJSON export."""
+    content = b"".join(res.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+def test_export_recipes(api_client, authenticated_user):
+    """Test exporting recipes as newline-delimited JSON."""
+    recipe = create_recipe(user=authenticated_user)
+    tag = Tag.objects.create(user=authenticated_user, name="Vegan")
+    recipe.tags.add(tag)
+    create_recipe(user=authenticated_user)
+    other_user = create_user(email="other@example.com", password="password123")
+    create_recipe(user=other_user)
+
+    res = api_client.get(EXPORT_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["Content-Type"] == "application/x-ndjson"
+    rows = read_export(res)
+    assert len(rows) == 2
+    exported = next(row for row in rows if row["id"] == recipe.id)
+    serializer = RecipeDetailSerializer(recipe)
+    for key, value in serializer.data.items():
+        assert exported[key] == value
+
+
+@pytest.mark.django_db
+def test_export_recipes_chunked_queries(api_client, authenticated_user, mocker):
+    """Test the export loads tags and ingredients once per chunk."""
+    mocker.patch.object(RecipeViewSet, "export_chunk_size", 2)
+    for _ in range(5):
+        create_recipe(user=authenticated_user)
+
+    with query_budget(100) as context:
+        res = api_client.get(EXPORT_URL)
+        rows = read_export(res)
+
+    assert len(rows) == 5
+    tag_queries = [
+        query
+        for query in context.captured_queries
+        if 'FROM "core_recipe_tags"' in query["sql"]
+    ]
+    assert len(tag_queries) == 3
+
+
+IMPORT_URL = reverse("recipe:recipe-import")
+
+
+def upload(name, content):
+    """Return an in-memory file upload."""
+    return SimpleUploadedFile(name, content.encode("utf-8"))
+
+
+@pytest.mark.django_db
+def test_import_recipes_ndjson(api_client, authenticated_user):
+    """Test importing recipes from newline-delimited JSON."""
+    lines = [json.dumps(batch_item(i)) for i in range(3)]
+    payload = {"file": upload("recipes.ndjson", "\n".join(lines))}
+
+    res = api_client.post(IMPORT_URL, payload, format="multipart")
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.data["created"] == 3
+    assert res.data["finished"]
+    recipes = Recipe.objects.filter(user=authenticated_user)
+    assert recipes.count() == 3
+    assert recipes.get(title="Recipe 1").tags.count() == 2
+
+
+@pytest.mark.django_db
+def test_import_recipes_csv(api_client, authenticated_user):
+    """Test importing recipes from CSV with tag and ingredient lists."""
+    content = (
+        "title,time_minutes,price,tags,ingredients\n"
+        "Porridge,5,1.50,Breakfast;Quick,Oats;Milk\n"
+    )
+    payload = {"file": upload("recipes.csv", content)}
+
+    res = api_client.post(IMPORT_URL, payload, format="multipart")
+
+    assert res.status_code == status.HTTP_200_OK
+    recipe = Recipe.objects.get(user=authenticated_user)
+    assert recipe.title == "Porridge"
+    assert set(recipe.tags.values_list("name", flat=True)) == {"Breakfast", "Quick"}
+    assert set(recipe.ingredients.values_list("name", flat=True)) == {"Oats", "Milk"}
+
+
+@pytest.mark.django_db
+def test_import_recipes_reports_row_errors(api_client, authenticated_user):
+    """Test invalid rows are reported while valid rows are imported."""
+    lines = [
+        json.dumps(batch_item(0)),
+        "{not json",
+        json.dumps(batch_item(2, price="cheap")),
+    ]
+    payload = {"file": upload("recipes.ndjson", "\n".join(lines))}
+
+    res = api_client.post(IMPORT_URL, payload, format="multipart")
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.data["created"] == 1
+    assert res.data["failed"] == 2
+    assert [error["row"] for error in res.data["errors"]] == [2, 3]
+    assert "price" in res.data["errors"][1]["errors"]
+
+
+@pytest.mark.django_db
+def test_import_recipes_resume(api_client, authenticated_user):
+    """Test resuming an import skips the rows already committed."""
+    job = RecipeImport.objects.create(
+        user=authenticated_user, source="recipes.ndjson", rows_done=2, created=2
+    )
+    lines = [json.dumps(batch_item(i)) for i in range(5)]
+    payload = {
+        "file": upload("recipes.ndjson", "\n".join(lines)),
+        "resume": job.id,
+    }
+
+    res = api_client.post(IMPORT_URL, payload, format="multipart")
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.data["id"] == job.id
+    assert res.data["rows_done"] == 5
+    assert res.data["created"] == 5
+    titles = set(
+        Recipe.objects.filter(user=authenticated_user).values_list("title", flat=True)
+    )
+    assert titles == {"Recipe 2", "Recipe 3", "Recipe 4"}
+
+
+@pytest.mark.django_db
+def test_import_resume_other_users_import_error(api_client, authenticated_user):
+    """Test an import of another user cannot be resumed."""
+    other_user = create_user(email="other@example.com", password="password123")
+    job = RecipeImport.objects.create(user=other_user, source="recipes.ndjson")
+    payload = {"file": upload("recipes.ndjson", ""), "resume": job.id}
+
+    res = api_client.post(IMPORT_URL, payload, format="multipart")
+
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_filter_by_tags_match_all(api_client, authenticated_user):
+    """Test filtering recipes linked to all of the given tags."""
+    tag1 = Tag.objects.create(user=authenticated_user, name="Vegan")
+    tag2 = Tag.objects.create(user=authenticated_user, name="Quick")
+    both = create_recipe(user=authenticated_user, title="Salad")
+    both.tags.add(tag1, tag2)
+    one = create_recipe(user=authenticated_user, title="Stew")
+    one.tags.add(tag1)
+
+    params = {"tags": f"{tag1.id},{tag2.id}", "match": "all"}
+    res = api_client.get(RECIPES_URL, params)
+
+    assert [recipe["id"] for recipe in res.data] == [both.id]
+
+
+@pytest.mark.django_db
+def test_filter_match_any_returns_unique_recipes(api_client, authenticated_user):
+    """Test a recipe matching several tags is listed once."""
+    tag1 = Tag.objects.create(user=authenticated_user, name="Vegan")
+    tag2 = Tag.objects.create(user=authenticated_user, name="Quick")
+    recipe = create_recipe(user=authenticated_user)
+    recipe.tags.add(tag1, tag2)
+
+    with query_budget(100) as context:
+        res = api_client.get(RECIPES_URL, {"tags": f"{tag1.id},{tag2.id}"})
+
+    assert [item["id"] for item in res.data] == [recipe.id]
+    assert not any("DISTINCT" in query["sql"] for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_filter_match_all_tags_and_ingredients(api_client, authenticated_user):
+    """Test match=all applies to both tags and ingredients."""
+    tag = Tag.objects.create(user=authenticated_user, name="Dinner")
+    in1 = Ingredient.objects.create(user=authenticated_user, name="Rice")
+    in2 = Ingredient.objects.create(user=authenticated_user, name="Beans")
+    match = create_recipe(user=authenticated_user, title="Rice and Beans")
+    match.tags.add(tag)
+    match.ingredients.add(in1, in2)
+    no_tag = create_recipe(user=authenticated_user, title="Rice Salad")
+    no_tag.ingredients.add(in1, in2)
+
+    params = {
+        "tags": f"{tag.id}",
+        "ingredients": f"{in1.id},{in2.id}",
+        "match": "all",
+    }
+    res = api_client.get(RECIPES_URL, params)
+
+    assert [recipe["id"] for recipe in res.data] == [match.id]
+
+
+@pytest.mark.django_db
+def test_filter_invalid_match_error(api_client, authenticated_user):
+    """Test an unknown match mode is rejected."""
+    res = api_client.get(RECIPES_URL, {"tags": "1", "match": "some"})
+
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_facets(api_client, authenticated_user):
+    """Test counting recipes per tag and ingredient."""
+    vegan = Tag.objects.create(user=authenticated_user, name="Vegan")
+    quick = Tag.objects.create(user=authenticated_user, name="Quick")
+    Tag.objects.create(user=authenticated_user, name="Unused")
+    salt = Ingredient.objects.create(user=authenticated_user, name="Salt")
+    r1 = create_recipe(user=authenticated_user)
+    r1.tags.add(vegan, quick)
+    r1.ingredients.add(salt)
+    r2 = create_recipe(user=authenticated_user)
+    r2.tags.add(vegan)
+    other_user = create_user(email="other@example.com", password="test123")
+    other_tag = Tag.objects.create(user=other_user, name="Vegan")
+    create_recipe(user=other_user).tags.add(other_tag)
+
+    res = api_client.get(FACETS_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.data == {
+        "tags": [
+            {"id": vegan.id, "name": "Vegan", "count": 2},
+            {"id": quick.id, "name": "Quick", "count": 1},
+        ],
+        "ingredients": [{"id": salt.id, "name": "Salt", "count": 1}],
+    }
+
+
+@pytest.mark.django_db
+def test_facets_follow_filters(api_client, authenticated_user):
+    """Test facet counts only include recipes matching the filters."""
+    vegan = Tag.objects.create(user=authenticated_user, name="Vegan")
+    quick = Tag.objects.create(user=authenticated_user, name="Quick")
+    salt = Ingredient.objects.create(user=authenticated_user, name="Salt")
+    r1 = create_recipe(user=authenticated_user)
+    r1.tags.add(vegan, quick)
+    r1.ingredients.add(salt)
+    r2 = create_recipe(user=authenticated_user)
+    r2.tags.add(vegan)
+
+    res = api_client.get(FACETS_URL, {"tags": str(quick.id)})
+
+    assert res.data == {
+        "tags": [
+            {"id": quick.id, "name": "Quick", "count": 1},
+            {"id": vegan.id, "name": "Vegan", "count": 1},
+        ],
+        "ingredients": [{"id": salt.id, "name": "Salt", "count": 1}],
+    }
+
+
+@pytest.mark.django_db
+def test_facets_single_query(api_client, authenticated_user):
+    """Test facets are computed with one query besides the version lookup."""
+    for i in range(3):
+        recipe = create_recipe(user=authenticated_user)
+        recipe.tags.add(Tag.objects.create(user=authenticated_user, name=f"T{i}"))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=authenticated_user, name=f"I{i}")
+        )
+
+    with query_budget(2):
+        res = api_client.get(FACETS_URL)
+
+    assert len(res.data["tags"]) == 3
+    assert len(res.data["ingredients"]) == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("search", [None, "curry"])
+def test_list_recipes_same_json_as_serializer(api_client, authenticated_user, search):
+    """Test the list read path renders the same JSON as the serializers."""
+    tags = [
+        Tag.objects.create(user=authenticated_user, name=name)
+        for name in ["Vegan", "Spicy", "Quick"]
+    ]
+    salt = Ingredient.objects.create(user=authenticated_user, name="Salt")
+    curry = create_recipe(
+        user=authenticated_user, title="Green curry", price=Decimal("12.50")
+    )
+    curry.tags.add(tags[2], tags[0], tags[1])
+    curry.ingredients.add(salt)
+    create_recipe(
+        user=authenticated_user, title="Red curry", price=Decimal("5.00"), link=""
+    ).tags.add(tags[1])
+    create_recipe(user=authenticated_user, title="Toast")
+    create_recipe(user=create_user(email="other@example.com"), title="Curry")
+    update_search_vectors(Recipe.objects.all())
+
+    queryset = Recipe.objects.filter(user=authenticated_user).prefetch_related(
+        Prefetch("tags", queryset=Tag.objects.order_by("id")),
+        Prefetch("ingredients", queryset=Ingredient.objects.order_by("id")),
+    )
+    if search:
+        queryset = search_recipes(queryset, search).order_by("-rank", "-id")
+        expected = RecipeSearchSerializer(queryset, many=True).data
+    else:
+        expected = RecipeSerializer(queryset.order_by("-id"), many=True).data
+
+    res = api_client.get(RECIPES_URL, {"search": search} if search else {})
+
+    assert res.status_code == status.HTTP_200_OK
+    assert len(res.data) == (2 if search else 3)
+    assert res.content == JSONRenderer().render(expected)
+
+
+@pytest.mark.django_db
+def test_list_recipes_paginated_same_json_as_serializer(
+    api_client, authenticated_user
+):
+    """Test a page of the list read path matches the serializer output."""
+    for i in range(3):
+        create_recipe(user=authenticated_user, title=f"Recipe {i}").tags.add(
+            Tag.objects.create(user=authenticated_user, name=f"Tag {i}")
+        )
+    queryset = Recipe.objects.filter(user=authenticated_user).order_by("-id")[:2]
+
+    res = api_client.get(RECIPES_URL, {"page_size": 2})
+
+    expected = RecipeSerializer(queryset, many=True).data
+    assert JSONRenderer().render(res.data["results"]) == JSONRenderer().render(
+        expected
+    )
+
+
+@pytest.mark.django_db
+def test_list_recipes_sparse_fields(api_client, authenticated_user):
+    """Test `fields` trims the list output and the queries behind it."""
+    recipe = create_recipe(user=authenticated_user, title="Soup")
+    recipe.tags.add(Tag.objects.create(user=authenticated_user, name="Vegan"))
+
+    with query_budget(100) as context:
+        res = api_client.get(RECIPES_URL, {"fields": "id,title,unknown"})
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.data == [{"id": recipe.id, "title": "Soup"}]
+    sql = "\n".join(query["sql"] for query in context.captured_queries)
+    assert '"price"' not in sql
+    assert "core_recipe_tags" not in sql
+    assert "core_recipe_ingredients" not in sql
+
+
+@pytest.mark.django_db
+def test_list_recipes_omit_fields(api_client, authenticated_user):
+    """Test `omit` drops fields and only their attributes are loaded."""
+    recipe = create_recipe(user=authenticated_user)
+    tag = Tag.objects.create(user=authenticated_user, name="Vegan")
+    recipe.tags.add(tag)
+
+    with query_budget(100) as context:
+        res = api_client.get(RECIPES_URL, {"omit": "ingredients,price"})
+
+    assert res.status_code == status.HTTP_200_OK
+    assert set(res.data[0]) == {"id", "title", "time_minutes", "link", "tags"}
+    assert res.data[0]["tags"] == [{"id": tag.id, "name": "Vegan"}]
+    sql = "\n".join(query["sql"] for query in context.captured_queries)
+    assert "core_recipe_ingredients" not in sql
+
+
+@pytest.mark.django_db
+def test_list_recipes_sparse_fields_paginated(api_client, authenticated_user):
+    """Test cursor pagination works without the ordering fields in output."""
+    recipes = [create_recipe(user=authenticated_user) for _ in range(3)]
+    update_search_vectors(Recipe.objects.all())
+
+    res = api_client.get(RECIPES_URL, {"page_size": 2, "fields": "title"})
+    next_page = api_client.get(res.data["next"])
+    search = api_client.get(RECIPES_URL, {"search": "sample", "fields": "title"})
+
+    assert res.data["results"] == [{"title": "Sample recipe title"}] * 2
+    assert next_page.data["results"] == [{"title": recipes[0].title}]
+    assert search.data == [{"title": "Sample recipe title"}] * 3
+
+
+@pytest.mark.django_db
+def test_get_recipe_detail_sparse_fields(api_client, authenticated_user, recipe):
+    """Test `fields` trims the detail output and the columns selected."""
+    recipe.tags.add(Tag.objects.create(user=authenticated_user, name="Vegan"))
+
+    with query_budget(100) as context:
+        res = api_client.get(detail_url(recipe.id), {"fields": "id,title"})
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.data == {"id": recipe.id, "title": recipe.title}
+    sql = "\n".join(query["sql"] for query in context.captured_queries)
+    assert '"description"' not in sql
+    assert "core_recipe_tags" not in sql
+
+
+@pytest.mark.django_db
+def test_sparse_fields_ignored_on_write(api_client, authenticated_user, recipe):
+    """Test writes validate and return every field whatever `fields` says."""
+    url = f"{detail_url(recipe.id)}?fields=id"
+
+    res = api_client.patch(url, {"title": "Changed"}, format="json")
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.data["title"] == "Changed"
+    assert "tags" in res.data
@@ -0,0 +1,125 @@
+"""
+Tests for the versioned response cache of the recipe APIs.
+"""
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from core.models import Tag
+from conftest import create_recipe, create_user, query_budget
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+@pytest.mark.django_db
+def test_list_returns_etag(api_client, authenticated_user):
+    """Test list responses carry an ETag."""
+    create_recipe(user=authenticated_user)
+
+    res = api_client.get(RECIPES_URL)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["ETag"].startswith('"')
+
+
+@pytest.mark.django_db
+def test_conditional_get_not_modified(api_client, authenticated_user):
+    """Test a matching If-None-Match returns 304 with one query."""
+    create_recipe(user=authenticated_user)
+    etag = api_client.get(RECIPES_URL)["ETag"]
+
+    with query_budget(1):
+        res = api_client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+    assert res.status_code == status.HTTP_304_NOT_MODIFIED
+    assert res["ETag"] == etag
+
+
+@pytest.mark.django_db
+def test_cached_response_skips_queries(api_client, authenticated_user):
+    """Test a repeated request is served from cache after a version lookup."""
+    create_recipe(user=authenticated_user)
+    first = api_client.get(RECIPES_URL)
+
+    with query_budget(1):
+        second = api_client.get(RECIPES_URL)
+
+    assert second.data == first.data
+    assert second["ETag"] == first["ETag"]
+
+
+@pytest.mark.django_db
+def test_write_invalidates_cache(api_client, authenticated_user):
+    """Test a write through the API changes the ETag and the response."""
+    recipe = create_recipe(user=authenticated_user, title="Old title")
+    etag = api_client.get(detail_url(recipe.id))["ETag"]
+
+    api_client.patch(detail_url(recipe.id), {"title": "New title"})
+    res = api_client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["ETag"] != etag
+    assert res.data["title"] == "New title"
+
+
+@pytest.mark.django_db
+def test_tag_write_invalidates_recipe_cache(api_client, authenticated_user):
+    """Test renaming a tag invalidates cached recipe responses."""
+    recipe = create_recipe(user=authenticated_user)
+    tag = Tag.objects.create(user=authenticated_user, name="Lunch")
+    recipe.tags.add(tag)
+    api_client.get(RECIPES_URL)
+
+    api_client.patch(reverse("recipe:tag-detail", args=[tag.id]), {"name": "Dinner"})
+    res = api_client.get(RECIPES_URL)
+
+    assert res.data[0]["tags"][0]["name"] == "Dinner"
+
+
+@pytest.mark.django_db
+def test_failed_write_keeps_cache(api_client, authenticated_user):
+    """Test a rejected write does not invalidate cached responses."""
+    create_recipe(user=authenticated_user)
+    etag = api_client.get(RECIPES_URL)["ETag"]
+
+    api_client.post(RECIPES_URL, {"title": "Missing fields"})
+    res = api_client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+    assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_cache_is_per_user(api_client, authenticated_user):
+    """Test cached responses are not shared between users."""
+    create_recipe(user=authenticated_user, title="Mine")
+    etag = api_client.get(TAGS_URL)["ETag"]
+    other_user = create_user(email="other@example.com", password="password123")
+    Tag.objects.create(user=other_user, name="Theirs")
+
+    api_client.force_authenticate(user=other_user)
+    res = api_client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res.data[0]["name"] == "Theirs"
+
+
+@pytest.mark.django_db
+def test_cache_is_per_accept_header(api_client, authenticated_user):
+    """Test responses negotiated for other Accept headers are not reused."""
+    recipe = create_recipe(user=authenticated_user)
+    etag = api_client.get(detail_url(recipe.id))["ETag"]
+
+    res = api_client.get(
+        detail_url(recipe.id),
+        HTTP_ACCEPT="application/json, image/webp",
+        HTTP_IF_NONE_MATCH=etag,
+    )
+
+    assert res.status_code == status.HTTP_200_OK
+    assert res["ETag"] != etag
@@ -0,0 +1,142 @@
+"""
+Tests for full-text search of recipes.
+"""
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from core.models import Tag, Ingredient
+from conftest import create_recipe, create_user
+from recipe.search import update_search_vectors
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def create_indexed_recipe(user, **params):
+    """Create a recipe and compute its search vector."""
+    recipe = create_recipe(user=user, **params)
+    update_search_vectors(type(recipe).objects.filter(pk=recipe.pk))
+    return recipe
+
+
+@pytest.mark.django_db
+def test_search_by_title(api_client, authenticated_user):
+    """Test searching recipes by words of the title."""
+    curry = create_indexed_recipe(authenticated_user, title="Thai Green Curry")
+    create_indexed_recipe(authenticated_user, title="Fish and Chips")
+
+    res = api_client.get(RECIPES_URL, {"search": "curry"})
+
+    assert res.status_code == status.HTTP_200_OK
+    assert [recipe["id"] for recipe in res.data] == [curry.id]
+    assert "<b>Curry</b>" in res.data[0]["headline"]
+
+
+@pytest.mark.django_db
+def test_search_headline_escapes_html(api_client, authenticated_user):
+    """Test HTML in recipes is escaped in the headline."""
+    create_indexed_recipe(
+        authenticated_user,
+        title="Curry & rice",
+        description='<img src="x" onerror="alert(1)"> Mild curry',
+    )
+
+    res = api_client.get(RECIPES_URL, {"search": "curry"})
+
+    headline = res.data[0]["headline"]
+    assert "<img" not in headline
+    assert "&lt;img" in headline
+    assert "&amp;" in headline
+    assert "<b>Curry</b>" in headline
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_above_description(api_client, authenticated_user):
+    """Test title matches rank above description matches."""
+    in_description = create_indexed_recipe(
+        authenticated_user, title="Soup", description="Great with lentils"
+    )
+    in_title = create_indexed_recipe(
+        authenticated_user, title="Lentil Daal", description="Spicy"
+    )
+
+    res = api_client.get(RECIPES_URL, {"search": "lentil"})
+
+    assert [recipe["id"] for recipe in res.data] == [in_title.id, in_description.id]
+    assert res.data[0]["rank"] > res.data[1]["rank"]
+
+
+@pytest.mark.django_db
+def test_search_tags_and_ingredients(api_client, authenticated_user):
+    """Test recipes created through the API are searchable by tags and ingredients."""
+    payload = {
+        "title": "Pancakes",
+        "time_minutes": 20,
+        "price": "3.00",
+        "tags": [{"name": "Breakfast"}],
+        "ingredients": [{"name": "Buttermilk"}],
+    }
+    api_client.post(RECIPES_URL, payload, format="json")
+
+    by_tag = api_client.get(RECIPES_URL, {"search": "breakfast"})
+    by_ingredient = api_client.get(RECIPES_URL, {"search": "buttermilk"})
+
+    assert [recipe["title"] for recipe in by_tag.data] == ["Pancakes"]
+    assert [recipe["title"] for recipe in by_ingredient.data] == ["Pancakes"]
+
+
+@pytest.mark.django_db
+def test_search_follows_tag_rename(api_client, authenticated_user):
+    """Test renaming a tag updates the search index of its recipes."""
+    recipe = create_recipe(user=authenticated_user)
+    tag = Tag.objects.create(user=authenticated_user, name="Lunch")
+    recipe.tags.add(tag)
+
+    api_client.patch(reverse("recipe:tag-detail", args=[tag.id]), {"name": "Supper"})
+
+    res = api_client.get(RECIPES_URL, {"search": "supper"})
+    assert [item["id"] for item in res.data] == [recipe.id]
+
+
+@pytest.mark.django_db
+def test_search_follows_ingredient_delete(api_client, authenticated_user):
+    """Test deleting an ingredient removes it from the search index."""
+    recipe = create_recipe(user=authenticated_user)
+    ingredient = Ingredient.objects.create(user=authenticated_user, name="Saffron")
+    recipe.ingredients.add(ingredient)
+    update_search_vectors(type(recipe).objects.filter(pk=recipe.pk))
+
+    api_client.delete(reverse("recipe:ingredient-detail", args=[ingredient.id]))
+
+    res = api_client.get(RECIPES_URL, {"search": "saffron"})
+    assert res.data == []
+
+
+@pytest.mark.django_db
+def test_search_limited_to_user(api_client, authenticated_user):
+    """Test search only returns the user's recipes."""
+    other_user = create_user(email="other@example.com", password="password123")
+    create_indexed_recipe(other_user, title="Secret Curry")
+
+    res = api_client.get(RECIPES_URL, {"search": "curry"})
+
+    assert res.data == []
+
+
+@pytest.mark.django_db
+def test_search_paginated_by_relevance(api_client, authenticated_user):
+    """Test paginated search results keep the relevance order."""
+    best = create_indexed_recipe(
+        authenticated_user, title="Tomato Tomato Soup", description="Tomato"
+    )
+    good = create_indexed_recipe(authenticated_user, title="Tomato Salad")
+    weak = create_indexed_recipe(
+        authenticated_user, title="Pasta", description="With tomato"
+    )
+
+    res = api_client.get(RECIPES_URL, {"search": "tomato", "page_size": 2})
+    ids = [recipe["id"] for recipe in res.data["results"]]
+    res = api_client.get(res.data["next"])
+    ids += [recipe["id"] for recipe in res.data["results"]]
+
+    assert ids == [best.id, good.id, weak.id]
@@ -8,7 +8,7 @@ from rest_framework import status
 
 from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
-from conftest import create_user
+from conftest import create_recipe, create_user, query_budget
 
 TAGS_URL = reverse("recipe:tag-list")
 
@@ -126,3 +126,112 @@ def test_filtered_tags_unique(authenticated_user, api_client):
     res = api_client.get(TAGS_URL, {"assigned_only": 1})
 
     assert len(res.data) == 1
+
+
+@pytest.mark.django_db
+def test_list_tags_cursor_pagination(api_client, authenticated_user):
+    """Test paginating tags ordered by name."""
+    for name in ["Breakfast", "Dinner", "Lunch"]:
+        Tag.objects.create(user=authenticated_user, name=name)
+
+    res = api_client.get(TAGS_URL, {"page_size": 2})
+
+    assert res.status_code == status.HTTP_200_OK
+    assert [tag["name"] for tag in res.data["results"]] == ["Lunch", "Dinner"]
+    res = api_client.get(res.data["next"])
+    assert [tag["name"] for tag in res.data["results"]] == ["Breakfast"]
+    assert res.data["next"] is None
+
+
+@pytest.mark.django_db
+def test_rename_tag_to_existing_name_error(api_client, authenticated_user):
+    """Test renaming a tag to a name already in use returns an error."""
+    Tag.objects.create(user=authenticated_user, name="Dessert")
+    tag = Tag.objects.create(user=authenticated_user, name="After Dinner")
+
+    res = api_client.patch(detail_url(tag.id), {"name": "Dessert"})
+
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+    tag.refresh_from_db()
+    assert tag.name == "After Dinner"
+
+
+@pytest.mark.django_db
+def test_filter_tags_unused(api_client, authenticated_user):
+    """Test listing tags not assigned to any recipe."""
+    used = Tag.objects.create(user=authenticated_user, name="Breakfast")
+    unused = Tag.objects.create(user=authenticated_user, name="Lunch")
+    create_recipe(user=authenticated_user).tags.add(used)
+
+    res = api_client.get(TAGS_URL, {"unused_only": 1})
+
+    assert res.data == [TagSerializer(unused).data]
+
+
+@pytest.mark.django_db
+def test_filter_tags_assigned_and_unused_error(api_client, authenticated_user):
+    """Test combining assigned_only and unused_only returns an error."""
+    res = api_client.get(TAGS_URL, {"assigned_only": 1, "unused_only": 1})
+
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_list_tags_with_counts(api_client, authenticated_user):
+    """Test listing tags with their recipe counts in one query."""
+    breakfast = Tag.objects.create(user=authenticated_user, name="Breakfast")
+    lunch = Tag.objects.create(user=authenticated_user, name="Lunch")
+    Tag.objects.create(user=authenticated_user, name="Dinner")
+    for _ in range(2):
+        create_recipe(user=authenticated_user).tags.add(breakfast, lunch)
+    create_recipe(user=authenticated_user).tags.add(breakfast)
+
+    with query_budget(2):
+        res = api_client.get(TAGS_URL, {"with_counts": 1})
+
+    assert res.status_code == status.HTTP_200_OK
+    assert [(tag["name"], tag["recipe_count"]) for tag in res.data] == [
+        ("Lunch", 2),
+        ("Dinner", 0),
+        ("Breakfast", 3),
+    ]
+
+
+@pytest.mark.django_db
+def test_list_assigned_tags_with_counts(api_client, authenticated_user):
+    """Test counts are not multiplied by the assigned_only filter."""
+    tag = Tag.objects.create(user=authenticated_user, name="Breakfast")
+    for _ in range(3):
+        create_recipe(user=authenticated_user).tags.add(tag)
+
+    res = api_client.get(TAGS_URL, {"assigned_only": 1, "with_counts": 1})
+
+    assert res.data == [{"id": tag.id, "name": "Breakfast", "recipe_count": 3}]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [{"with_counts": "yes"}, {"unused_only": "x"}, {"assigned_only": 2}],
+)
+def test_list_tags_invalid_flag(api_client, authenticated_user, params):
+    """Test flags other than 0 or 1 are rejected."""
+    res = api_client.get(TAGS_URL, params)
+
+    assert res.status_code == status.HTTP_400_BAD_REQUEST
+    assert list(res.data) == list(params)
+
+
+@pytest.mark.django_db
+def test_list_tags_sparse_fields(api_client, authenticated_user):
+    """Test `fields` and `omit` trim the tag list output."""
+    tag = Tag.objects.create(user=authenticated_user, name="Breakfast")
+    create_recipe(user=authenticated_user).tags.add(tag)
+
+    names = api_client.get(TAGS_URL, {"fields": "name"})
+    with query_budget(100) as context:
+        counts = api_client.get(TAGS_URL, {"with_counts": 1, "omit": "recipe_count"})
+
+    assert names.data == [{"name": "Breakfast"}]
+    assert counts.data == [{"id": tag.id, "name": "Breakfast"}]
+    assert not any("COUNT(" in query["sql"] for query in context.captured_queries)
@@ -8,7 +8,7 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 
 router = DefaultRouter()
@@ -20,4 +20,15 @@ app_name = "recipe"
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("async/recipes/", async_views.recipe_list, name="async-recipe-list"),
+    path(
+        "async/recipes/<int:pk>/",
+        async_views.recipe_detail,
+        name="async-recipe-detail",
+    ),
+    path(
+        "async/recipes/<int:pk>/upload-image/",
+        async_views.recipe_upload_image,
+        name="async-recipe-upload-image",
+    ),
 ]
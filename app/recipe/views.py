@@ -1,11 +1,27 @@
 """
 Views for the recipe APIs
 """
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Prefetch
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from PIL import UnidentifiedImageError
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -13,33 +29,133 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+from core.authentication import CachedTokenAuthentication
+from core.mixins import ReplicaReadMixin
 from core.models import Recipe, Tag, Ingredient
-from recipe import serializers
+from recipe import serializers, pagination, bulk, importer, images
+from recipe.facets import facet_counts
+from recipe.caching import VersionedCacheMixin
+from recipe.renderers import NDJSONRenderer
+from recipe.search import search_recipes, update_search_vectors
+
+
+RECIPE_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        "tags",
+        OpenApiTypes.STR,
+        description="Comma separated list of tag IDs to filter",
+    ),
+    OpenApiParameter(
+        "ingredients",
+        OpenApiTypes.STR,
+        description="Comma separated list of ingredient IDs to filter",
+    ),
+    OpenApiParameter(
+        "match",
+        OpenApiTypes.STR,
+        enum=["any", "all"],
+        description=(
+            "Match recipes linked to any (default) or all of the "
+            "given tags and ingredients"
+        ),
+    ),
+    OpenApiParameter(
+        "search",
+        OpenApiTypes.STR,
+        description=(
+            "Full-text search over title, description, tags and "
+            "ingredients, ordered by relevance"
+        ),
+    ),
+]
+
+IMAGE_PARAMETERS = [
+    OpenApiParameter(
+        "variant",
+        OpenApiTypes.STR,
+        description="Serve a generated variant instead of the original image",
+    ),
+    OpenApiParameter(
+        "format",
+        OpenApiTypes.STR,
+        description="Format of the variant, by default the best one accepted",
+    ),
+    OpenApiParameter(
+        "width",
+        OpenApiTypes.INT,
+        description="Serve a copy resized to this width",
+    ),
+    OpenApiParameter(
+        "quality",
+        OpenApiTypes.INT,
+        description="Quality of the resized copy",
+    ),
+]
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        OpenApiTypes.STR,
+        description="Comma separated list of fields to include in the response",
+    ),
+    OpenApiParameter(
+        "omit",
+        OpenApiTypes.STR,
+        description="Comma separated list of fields to leave out of the response",
+    ),
+]
+
+
+class SparseFieldsViewMixin:
+    """Tell which fields a read response includes, so queries can be pruned."""
+
+    sparse_field_actions = ("list", "retrieve")
+
+    def get_response_fields(self):
+        """Return the fields selected with `fields`/`omit`, or None for all."""
+        params = self.request.query_params
+        if self.action not in self.sparse_field_actions or not (
+            "fields" in params or "omit" in params
+        ):
+            return None
+        return set(self.get_serializer().fields)
 
 
 @extend_schema_view(
-    list=extend_schema(
-        parameters=[
-            OpenApiParameter(
-                "tags",
-                OpenApiTypes.STR,
-                description="Comma separated list of tag IDs to filter",
-            ),
-            OpenApiParameter(
-                "ingredients",
-                OpenApiTypes.STR,
-                description="Comma separated list of ingredient IDs to filter",
-            ),
-        ]
-    )
+    list=extend_schema(parameters=RECIPE_FILTER_PARAMETERS + SPARSE_FIELDS_PARAMETERS),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
+    facets=extend_schema(parameters=RECIPE_FILTER_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ReplicaReadMixin,
+    SparseFieldsViewMixin,
+    VersionedCacheMixin,
+    viewsets.ModelViewSet,
+):
     """View for manage recipe APIs."""
 
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = pagination.RecipeCursorPagination
+
+    batch_max_size = 1000
+    export_fields = [
+        "id",
+        "title",
+        "description",
+        "time_minutes",
+        "price",
+        "link",
+        "image",
+        "image_variants",
+    ]
+    export_chunk_size = 1000
+    import_chunk_size = 500
+    import_max_reported_errors = 100
+    # Response fields stored in a model column of another name.
+    field_columns = {"variants": "image_variants"}
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers."""
@@ -49,24 +165,101 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Retrieve recipes for authenticated user."""
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
+        match = self.request.query_params.get("match", "any")
+        if match not in ("any", "all"):
+            raise ValidationError({"match": "Must be 'any' or 'all'."})
+
         queryset = self.queryset
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_linked(
+                queryset, Recipe.tags.through, "tag_id", tag_ids, match
+            )
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = self._filter_linked(
+                queryset,
+                Recipe.ingredients.through,
+                "ingredient_id",
+                ingredient_ids,
+                match,
+            )
+
+        queryset = queryset.filter(user=self.request.user)
+        fields = self.get_response_fields()
+        for name, model in (("tags", Tag), ("ingredients", Ingredient)):
+            if fields is None or name in fields:
+                queryset = queryset.prefetch_related(
+                    Prefetch(name, queryset=model.objects.order_by("id"))
+                )
+        if fields is not None:
+            queryset = queryset.only(*self._columns(fields))
+        search = self.request.query_params.get("search")
+        if search:
+            return search_recipes(queryset, search).order_by("-rank", "-id")
 
-        return queryset.filter(user=self.request.user).order_by("-id").distinct()
+        return queryset.order_by("-id")
+
+    def _columns(self, fields):
+        """Return the recipe columns needed to render `fields`."""
+        concrete = {field.name for field in Recipe._meta.concrete_fields}
+        columns = [self.field_columns.get(name, name) for name in fields]
+        return ["id"] + [column for column in columns if column in concrete]
+
+    def _filter_linked(self, queryset, through, field, ids, match):
+        """Filter recipes linked to any or all of `ids` with a semijoin."""
+        links = through.objects.filter(**{f"{field}__in": ids})
+        if match == "all":
+            matching = (
+                links.values("recipe_id")
+                .annotate(matched=Count("id"))
+                .filter(matched=len(set(ids)))
+                .values("recipe_id")
+            )
+            return queryset.filter(pk__in=matching)
+        return queryset.filter(Exists(links.filter(recipe_id=OuterRef("pk"))))
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if self.action == "list":
+            if self.request.query_params.get("search"):
+                return serializers.RecipeSearchSerializer
             return serializers.RecipeSerializer
         elif self.action == "upload_image":
             return serializers.RecipeImageSerializer
+        elif self.action == "import_recipes":
+            return serializers.RecipeImportSerializer
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        """List recipes from plain rows, skipping model serialization."""
+        return self._cached_response(self._list_rows, request, *args, **kwargs)
+
+    def _list_rows(self, request, *args, **kwargs):
+        """Return the list response built from `values()` rows.
+
+        The output is the same as serializing the recipes with the list
+        serializer, at a fraction of the CPU cost per recipe. Only the
+        columns and attributes of the selected fields are loaded, plus the
+        id and ordering the pagination needs.
+        """
+        serializer = serializers.RowSerializer(
+            self.get_serializer_class(), self.get_serializer_context()
+        )
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        ordering = [name.lstrip("-") for name in queryset.query.order_by]
+        queryset = queryset.values(
+            *dict.fromkeys(["id", *ordering, *serializer.value_fields])
+        )
+        page = self.paginate_queryset(queryset)
+        rows = bulk.add_recipe_attrs(
+            list(queryset) if page is None else page, serializer.nested_fields
+        )
+        data = serializer.to_representation(rows)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
     def perform_create(self, serializer):
         """Create a new recipe."""
         serializer.save(user=self.request.user)
@@ -78,11 +271,209 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            # In one transaction, so the stored image cannot be released by
+            # another recipe before this one references it.
+            with transaction.atomic():
+                recipe = serializer.save(image_variants={})
+                images.schedule_variants(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        parameters=IMAGE_PARAMETERS,
+        responses={(200, "image/*"): OpenApiTypes.BINARY},
+    )
+    @action(methods=["GET"], detail=True, url_path="image")
+    def image(self, request, pk=None):
+        """Serve the image of a recipe, a variant or a resized copy, to its owner.
+
+        Behind the proxy the transfer is handed off with X-Accel-Redirect
+        to an internal location, so the worker is free while nginx sends
+        the file. Otherwise the file is streamed from Django.
+        """
+        recipe = self.get_object()
+        if not recipe.image:
+            raise Http404("Recipe has no image.")
+        name = self._image_file(recipe, request.query_params)
+
+        content_type = mimetypes.guess_type(name)[0]
+        if settings.MEDIA_ACCEL_REDIRECT:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = (
+                f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX}{name}"
+            )
+        else:
+            response = FileResponse(
+                default_storage.open(name, "rb"), content_type=content_type
+            )
+        response["Cache-Control"] = "private, max-age=86400"
+        return response
+
+    def _image_file(self, recipe, params):
+        """Return the name under the media root of the requested image file.
+
+        Missing variants and sizes that are not allowed raise Http404.
+        Resized copies are created on first request and then kept in the
+        resize cache.
+        """
+        variant = params.get("variant")
+        if variant is not None:
+            names = recipe.image_variants.get(variant, {})
+            file_format = params.get("format") or images.preferred_format(
+                self.request.headers.get("Accept", "")
+            )
+            if file_format not in names:
+                raise Http404("Image variant not found.")
+            return names[file_format]
+
+        if "width" not in params:
+            return recipe.image.name
+        try:
+            width = int(params["width"])
+            quality = int(params.get("quality", images.RESIZE_DEFAULT_QUALITY))
+        except ValueError:
+            raise Http404("Unknown image size.")
+        if width not in images.RESIZE_WIDTHS or quality not in images.RESIZE_QUALITIES:
+            raise Http404("Unknown image size.")
+        try:
+            path = images.get_resized(recipe.image.name, width, quality)
+        except (
+            FileNotFoundError,
+            UnidentifiedImageError,
+            ValueError,
+            SuspiciousFileOperation,
+        ):
+            raise Http404("Image not found.")
+        return os.path.relpath(path, settings.MEDIA_ROOT)
+
+    def perform_content_negotiation(self, request, force=False):
+        """Serve images whatever media types the client accepts."""
+        return super().perform_content_negotiation(
+            request, force=force or self.action == "image"
+        )
+
+    @extend_schema(
+        request=serializers.RecipeDetailSerializer(many=True),
+        responses=serializers.RecipeBatchResultSerializer(many=True),
+    )
+    @action(methods=["POST"], detail=False, url_path="batch")
+    def batch(self, request):
+        """Create many recipes at once, reporting errors per item."""
+        if not isinstance(request.data, list):
+            return Response(
+                {"detail": "Expected a list of recipes."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(request.data) > self.batch_max_size:
+            return Response(
+                {"detail": f"At most {self.batch_max_size} recipes per batch."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = serializers.RecipeDetailSerializer(
+            context=self.get_serializer_context()
+        )
+        validated = bulk.validate_recipes(request.data, serializer)
+        valid = [item for item in validated if not isinstance(item, ValidationError)]
+        created = iter(bulk.create_recipes(request.user, valid))
+        errors = dict(bulk.item_errors(validated))
+        results = [
+            {"row": row, "errors": errors[row]}
+            if row in errors
+            else {"row": row, "id": next(created).id}
+            for row in range(1, len(validated) + 1)
+        ]
+
+        if not valid:
+            status_code = status.HTTP_400_BAD_REQUEST
+        elif len(valid) < len(validated):
+            status_code = status.HTTP_207_MULTI_STATUS
+        else:
+            status_code = status.HTTP_201_CREATED
+        return Response(results, status=status_code)
+
+    @extend_schema(responses={(200, NDJSONRenderer.media_type): OpenApiTypes.STR})
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="export",
+        renderer_classes=[NDJSONRenderer],
+    )
+    def export(self, request):
+        """Stream the user's recipes as newline-delimited JSON."""
+        rows = bulk.iter_recipe_rows(
+            self.get_queryset(), self.export_fields, self.export_chunk_size
+        )
+        response = StreamingHttpResponse(
+            (NDJSONRenderer.render_line(self._export_row(row)) for row in rows),
+            content_type=NDJSONRenderer.media_type,
+        )
+        response["Content-Disposition"] = 'attachment; filename="recipes.ndjson"'
+        return response
+
+    @extend_schema(responses=serializers.RecipeFacetsSerializer)
+    @action(methods=["GET"], detail=False, url_path="facets")
+    def facets(self, request):
+        """Count the filtered recipes per tag and ingredient."""
+        return self._cached_response(self._facets_response, request)
+
+    def _facets_response(self, request):
+        """Return the facet counts of the filtered recipes."""
+        return Response(facet_counts(self.get_queryset()))
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        url_name="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_recipes(self, request):
+        """Import recipes from an NDJSON or CSV upload.
+
+        Pass the `id` of an interrupted import as `resume` to continue it
+        after its last committed chunk.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(user=request.user)
+        upload = serializer.validated_data["file"]
+        file_format = serializer.validated_data.get(
+            "format", importer.detect_format(upload.name)
+        )
+
+        errors = []
+
+        def report_errors(job, chunk_errors):
+            for row, detail in chunk_errors:
+                if len(errors) < self.import_max_reported_errors:
+                    errors.append({"row": row, "errors": detail})
+
+        importer.import_recipes(
+            job,
+            importer.parse_rows(upload, file_format),
+            serializers.RecipeDetailSerializer(context=self.get_serializer_context()),
+            chunk_size=self.import_chunk_size,
+            on_chunk=report_errors,
+        )
+        return Response(
+            {**self.get_serializer(job).data, "errors": errors},
+            status=status.HTTP_200_OK,
+        )
+
+    def _export_row(self, row):
+        """Convert an exported row to the recipe detail representation."""
+        row["price"] = str(row["price"])
+        if row["image"]:
+            row["image"] = images.image_url(row["id"], row["image"], self.request)
+        else:
+            row["image"] = None
+        row["variants"] = images.variant_urls(
+            row["id"], row.pop("image_variants"), self.request
+        )
+        return row
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -93,10 +484,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 enum=[0, 1],
                 description="Filter by items assigned to recipes.",
             ),
+            OpenApiParameter(
+                "unused_only",
+                OpenApiTypes.INT,
+                enum=[0, 1],
+                description="Filter by items not assigned to any recipe.",
+            ),
+            OpenApiParameter(
+                "with_counts",
+                OpenApiTypes.INT,
+                enum=[0, 1],
+                description="Include the number of recipes using each item.",
+            ),
+            *SPARSE_FIELDS_PARAMETERS,
         ]
     )
 )
 class BaseRecipeAttrViewSet(
+    ReplicaReadMixin,
+    SparseFieldsViewMixin,
+    VersionedCacheMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
@@ -104,23 +511,72 @@ class BaseRecipeAttrViewSet(
 ):
     """Base viewset for recipe attributess."""
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = pagination.RecipeAttrCursorPagination
+    count_serializer_class = None
+
+    def _flag(self, name):
+        """Return whether the query parameter `name` is set to 1."""
+        value = self.request.query_params.get(name, "0")
+        if value not in ("0", "1"):
+            raise ValidationError({name: "Must be 0 or 1."})
+        return value == "1"
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        assigned_only = bool(int(self.request.query_params.get("assigned_only", 0)))
+        assigned_only = self._flag("assigned_only")
+        unused_only = self._flag("unused_only")
+        if assigned_only and unused_only:
+            raise ValidationError(
+                {"unused_only": "Cannot be combined with assigned_only."}
+            )
+
         queryset = self.queryset
+        model = queryset.model
+        links = model.recipe_set.through.objects.filter(
+            **{f"{model._meta.model_name}_id": OuterRef("pk")}
+        )
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(Exists(links))
+        elif unused_only:
+            queryset = queryset.filter(~Exists(links))
+        fields = self.get_response_fields()
+        if fields is not None:
+            # The name is always loaded for the cursor pagination.
+            queryset = queryset.only("id", "name")
+        if (
+            self.action == "list"
+            and self._flag("with_counts")
+            and (fields is None or "recipe_count" in fields)
+        ):
+            queryset = queryset.annotate(recipe_count=Count("recipe"))
+
+        return queryset.filter(user=self.request.user).order_by("-name")
+
+    def get_serializer_class(self):
+        """Return the serializer class for request."""
+        if self.action == "list" and self._flag("with_counts"):
+            return self.count_serializer_class
+        return self.serializer_class
+
+    def perform_update(self, serializer):
+        """Update the item and the search vectors of its recipes."""
+        attr = serializer.save()
+        update_search_vectors(Recipe.objects.filter(pk__in=attr.recipe_set.values("pk")))
 
-        return queryset.filter(user=self.request.user).order_by("-name").distinct()
+    def perform_destroy(self, instance):
+        """Delete the item and update the search vectors of its recipes."""
+        recipe_ids = list(instance.recipe_set.values_list("pk", flat=True))
+        instance.delete()
+        update_search_vectors(Recipe.objects.filter(pk__in=recipe_ids))
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database."""
 
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
     queryset = Tag.objects.all()
 
 
@@ -128,4 +584,5 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database."""
 
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
     queryset = Ingredient.objects.all()
@@ -8,6 +8,7 @@ from conftest import create_user
 CREATE_USER_URL = reverse("user:create")
 TOKEN_URL = reverse("user:token")
 ME_URL = reverse("user:me")
+RECIPES_URL = reverse("recipe:recipe-list")
 
 
 @pytest.mark.django_db
@@ -132,3 +133,50 @@ def test_update_user_profile(api_client, authenticated_user):
     assert res.status_code == status.HTTP_200_OK
     authenticated_user.name == payload["name"]
     assert authenticated_user.check_password(payload["password"])
+
+
+@pytest.mark.django_db
+def test_update_user_profile_from_stale_user(api_client, authenticated_user):
+    """Test updating the profile does not undo changes the request user misses."""
+    get_user_model().objects.filter(pk=authenticated_user.pk).update(
+        email="changed@example.com"
+    )
+
+    res = api_client.patch(ME_URL, {"name": "Updated name"})
+
+    authenticated_user.refresh_from_db()
+    assert res.status_code == status.HTTP_200_OK
+    assert authenticated_user.name == "Updated name"
+    assert authenticated_user.email == "changed@example.com"
+
+
+@pytest.mark.django_db
+def test_update_user_profile_keeps_cached_recipes_fresh(
+    api_client, authenticated_user
+):
+    """Test updating the profile does not bring back older cached recipes."""
+    payload = {"title": "Sample recipe", "time_minutes": 5, "price": "5.50"}
+    assert api_client.get(RECIPES_URL).data == []
+    assert api_client.post(RECIPES_URL, payload).status_code == 201
+
+    res = api_client.patch(ME_URL, {"name": "Updated name"})
+    recipes = api_client.get(RECIPES_URL).data
+
+    assert res.status_code == status.HTTP_200_OK
+    assert [recipe["title"] for recipe in recipes] == [payload["title"]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_user_and_token_async(api_client):
+    """Test the async user and token views, which hash in worker threads."""
+    payload = {"email": "test@example.com", "password": "testpass123", "name": "Test"}
+
+    created = api_client.post(reverse("user:async-create"), payload)
+    res = api_client.post(
+        reverse("user:async-token"),
+        {"email": payload["email"], "password": payload["password"]},
+    )
+
+    assert created.status_code == status.HTTP_201_CREATED
+    assert res.status_code == status.HTTP_200_OK
+    assert "token" in res.json()
@@ -12,4 +12,6 @@ urlpatterns = [
     path("create/", views.CreateUserView.as_view(), name="create"),
     path("token/", views.CreateTokenView.as_view(), name="token"),
     path("me/", views.ManageUserView.as_view(), name="me"),
+    path("async/create/", views.create_user_async, name="async-create"),
+    path("async/token/", views.create_token_async, name="async-token"),
 ]
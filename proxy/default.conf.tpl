@@ -1,13 +1,38 @@
 server {
     listen ${LISTEN_PORT};
 
-    location /static {
-        alias /vol/static;
+    # Collected static assets only. Uploaded media are private and only
+    # reachable through the app, see /protected-media/.
+    location /static/static/ {
+        alias /vol/static/static/;
     }
 
+    location /static/media/ {
+        return 404;
+    }
+
+    # Fingerprinted static files never change: cache them for a year and
+    # serve the gzip copies written by collectstatic to clients taking them.
+    location ~ "^/static/static/(.+\.[0-9a-f]{12}\.\w+)$" {
+        alias /vol/static/static/$1;
+        gzip_static on;
+        gzip_vary on;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
+    # Authenticated media, variants and resized copies: the app checks
+    # access and answers with an X-Accel-Redirect here, keeping its
+    # Cache-Control header.
+    location /protected-media/ {
+        internal;
+        alias /vol/static/media/;
+        sendfile on;
+        tcp_nopush on;
+    }
+
+    # Passes requests to uWSGI or, with APP_SERVER=asgi, to uvicorn.
     location / {
-        uwsgi_pass              ${APP_HOST}:${APP_PORT};
-        include                 /etc/nginx/uwsgi_params;
+        include                 /etc/nginx/app.conf;
         client_max_body_size    10M;
     }
-}
\ No newline at end of file
+}
@@ -0,0 +1,12 @@
+#!/bin/sh
+
+set -e
+
+python manage.py wait_for_db
+python manage.py collectstatic --noinput
+python manage.py migrate
+
+# Serves HTTP rather than the uwsgi protocol: set APP_SERVER=asgi on the
+# app and the proxy, which then uses proxy_pass instead of uwsgi_pass.
+uvicorn app.asgi:application --host 0.0.0.0 --port 9000 --workers 4 \
+    --proxy-headers --forwarded-allow-ips '*'
@@ -2,6 +2,10 @@
 
 set -e
 
+if [ "${APP_SERVER}" = "asgi" ]; then
+    exec run-asgi.sh
+fi
+
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate